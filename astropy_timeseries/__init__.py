@@ -14,3 +14,4 @@ if not _ASTROPY_SETUP_:
     from .binned import *  # noqa
     from . import io  # noqa
     from .downsample import *  # noqa
+    from .merge import *  # noqa
@@ -0,0 +1,298 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Conversion of time series to and from Apache Arrow tables.
+
+Numerical columns are converted by sharing their buffers, and time columns are
+stored either as Arrow timestamps or as double precision offsets in days from
+a reference Julian Date. The information needed to reconstruct the columns,
+such as units and time scales, is stored as JSON in the metadata of the Arrow
+fields, and the table metadata in the metadata of the Arrow schema.
+"""
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.table import Column, MaskedColumn, QTable
+from astropy.time import Time
+
+from .sampled import _datetime64_to_jd, _jd_to_datetime64
+
+__all__ = []
+
+SCHEMA_KEY = b'astropy_timeseries'
+FIELD_KEY = b'astropy'
+
+TIME_ENCODINGS = ('offset', 'timestamp')
+
+
+def _values_to_arrow(values, mask=None):
+    """
+    Convert a Numpy array to an Arrow array, sharing the buffer of numerical
+    arrays in the native byte order. Arrays with more than one dimension are
+    converted to fixed size list arrays of the flattened values.
+    """
+
+    import pyarrow as pa
+
+    values = np.asarray(values)
+
+    if not values.dtype.isnative:
+        values = values.astype(values.dtype.newbyteorder('='))
+
+    if mask is not None and not np.any(mask):
+        mask = None
+
+    if values.ndim > 1:
+        size = int(np.prod(values.shape[1:]))
+        flat = np.ascontiguousarray(values).reshape(-1)
+        if mask is not None:
+            mask = np.ascontiguousarray(np.broadcast_to(mask, values.shape)).reshape(-1)
+        return pa.FixedSizeListArray.from_arrays(pa.array(flat, mask=mask), size)
+
+    return pa.array(values, mask=mask)
+
+
+def _values_from_arrow(array):
+    """
+    Convert an Arrow array to a Numpy array and a mask of the null values (or
+    `None` if there are none). Numerical arrays share the Arrow buffer, and
+    are therefore read-only.
+    """
+
+    import pyarrow as pa
+
+    if pa.types.is_fixed_size_list(array.type):
+        values, mask = _values_from_arrow(array.flatten())
+        shape = (len(array), -1)
+        return values.reshape(shape), None if mask is None else mask.reshape(shape)
+
+    if array.null_count == 0:
+        return array.to_numpy(zero_copy_only=False), None
+
+    mask = array.is_null().to_numpy(zero_copy_only=False)
+
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+        dtype = np.dtype(array.type.to_pandas_dtype())
+    elif pa.types.is_timestamp(array.type):
+        dtype = np.dtype('datetime64[{0}]'.format(array.type.unit))
+    elif pa.types.is_boolean(array.type):
+        return array.fill_null(False).to_numpy(zero_copy_only=False), mask
+    elif pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return array.fill_null('').to_numpy(zero_copy_only=False), mask
+    elif pa.types.is_binary(array.type) or pa.types.is_large_binary(array.type):
+        return array.fill_null(b'').to_numpy(zero_copy_only=False), mask
+    else:
+        return array.to_numpy(zero_copy_only=False), mask
+
+    # Read the values of numerical arrays directly from the data buffer
+    # rather than letting Arrow fill the null values in a copy.
+    values = np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array),
+                           offset=array.offset * dtype.itemsize)
+
+    return values, mask
+
+
+def _time_to_arrow(time, time_encoding):
+    """
+    Convert a time column to an Arrow array, returning the array and the
+    field metadata.
+    """
+
+    import pyarrow as pa
+
+    metadata = OrderedDict([('class', 'Time'),
+                            ('encoding', time_encoding),
+                            ('scale', time.scale),
+                            ('format', time.format),
+                            ('precision', time.precision)])
+
+    if time.location is not None:
+        if not time.location.isscalar:
+            raise TypeError("Time columns with non-scalar locations cannot be converted "
+                            "to Arrow tables")
+        metadata['location'] = [float(value) for value in time.location.geocentric.to_value(u.m)]
+
+    mask = time.mask if time.masked and np.any(time.mask) else None
+
+    if time_encoding == 'timestamp':
+        unit_type = pa.timestamp('ns', tz='UTC' if time.scale == 'utc' else None)
+        values = np.ma.getdata(_jd_to_datetime64(time)).view(np.int64)
+        return pa.array(values, type=unit_type, mask=mask), metadata
+
+    # The integer part of the first Julian Date is used as the reference, so
+    # that the offsets are small and can be computed exactly from the two
+    # parts of the Julian Dates.
+    jd1, jd2 = np.ma.getdata(time.jd1), np.ma.getdata(time.jd2)
+    valid = jd1 if mask is None else jd1[~mask]
+    reference = float(np.floor(valid[0])) if len(valid) > 0 else 0.
+    metadata['reference'] = reference
+
+    offsets = (jd1 - reference) + jd2
+
+    return pa.array(offsets, mask=mask), metadata
+
+
+def _time_from_arrow(array, metadata):
+    """
+    Convert an Arrow array of offsets or timestamps to a time column.
+    """
+
+    import pyarrow as pa
+
+    values, mask = _values_from_arrow(array)
+
+    scale = metadata.get('scale', 'utc')
+
+    location = metadata.get('location')
+    if location is not None:
+        location = EarthLocation.from_geocentric(*location, unit=u.m)
+
+    if pa.types.is_timestamp(array.type):
+        if mask is not None:
+            values = np.where(mask, np.datetime64('NaT'), values)
+        jd1, jd2, mask = _datetime64_to_jd(values, scale)
+        time = Time(jd1, jd2, format='jd', scale=scale, location=location, copy=False)
+        time.format = metadata.get('format', 'datetime64')
+    else:
+        if mask is not None:
+            values = np.where(mask, 0., values)
+        time = Time(metadata['reference'], values, format='jd', scale=scale,
+                    location=location)
+        time.format = metadata['format']
+
+    if 'precision' in metadata:
+        time.precision = metadata['precision']
+
+    if mask is not None and np.any(mask):
+        time[mask] = np.ma.masked
+
+    return time
+
+
+def time_series_to_arrow(time_series, time_encoding='offset'):
+    """
+    Convert a time series to a :class:`pyarrow.Table`.
+
+    See :meth:`~astropy_timeseries.TimeSeries.to_arrow` for details.
+    """
+
+    import pyarrow as pa
+
+    if time_encoding not in TIME_ENCODINGS:
+        raise ValueError("time_encoding should be one of {0}".format(
+                         '/'.join(repr(encoding) for encoding in TIME_ENCODINGS)))
+
+    arrays = []
+    fields = []
+
+    for name in time_series.colnames:
+
+        col = time_series[name]
+
+        if isinstance(col, Time):
+            array, metadata = _time_to_arrow(col, time_encoding)
+        elif isinstance(col, u.Quantity):
+            metadata = OrderedDict([('class', 'Quantity'), ('unit', col.unit.to_string())])
+            # Masked quantities have the values and mask as attributes
+            value = col.value
+            array = _values_to_arrow(getattr(value, 'unmasked', value),
+                                     mask=getattr(value, 'mask', None))
+        elif isinstance(col, Column):
+            metadata = OrderedDict([('class', 'Column'),
+                                    ('unit', None if col.unit is None else col.unit.to_string())])
+            if isinstance(col, MaskedColumn):
+                array = _values_to_arrow(col.data.data, mask=col.mask)
+            else:
+                array = _values_to_arrow(col.data)
+            if col.dtype.kind in 'SU':
+                metadata['dtype'] = col.dtype.str
+        else:
+            raise TypeError("Column '{0}' of type {1} cannot be converted to an Arrow "
+                            "table".format(name, col.__class__.__name__))
+
+        if getattr(col, 'ndim', 1) > 1:
+            metadata['shape'] = list(col.shape[1:])
+
+        if col.info.description is not None:
+            metadata['description'] = col.info.description
+
+        arrays.append(array)
+        fields.append(pa.field(name, array.type, metadata={FIELD_KEY: json.dumps(metadata)}))
+
+    try:
+        schema_metadata = json.dumps(OrderedDict([('class', time_series.__class__.__name__),
+                                                  ('meta', time_series.meta)]))
+    except TypeError:
+        raise TypeError("The metadata should be JSON-serializable to be converted to an "
+                        "Arrow table")
+
+    schema = pa.schema(fields, metadata={SCHEMA_KEY: schema_metadata})
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def time_series_from_arrow(cls, table):
+    """
+    Convert a :class:`pyarrow.Table` to a time series of class ``cls``.
+
+    See :meth:`~astropy_timeseries.TimeSeries.from_arrow` for details.
+    """
+
+    import pyarrow as pa
+
+    if not isinstance(table, pa.Table):
+        raise TypeError("Input should be a pyarrow Table")
+
+    schema_metadata = table.schema.metadata or {}
+    if SCHEMA_KEY in schema_metadata:
+        meta = json.loads(schema_metadata[SCHEMA_KEY].decode('utf-8'),
+                          object_pairs_hook=OrderedDict)['meta']
+    else:
+        meta = None
+
+    columns = []
+
+    for field, chunked in zip(table.schema, table.columns):
+
+        if field.metadata is not None and FIELD_KEY in field.metadata:
+            metadata = json.loads(field.metadata[FIELD_KEY].decode('utf-8'))
+        else:
+            metadata = {}
+
+        # Single chunks, as produced by to_arrow, are used as they are
+        if chunked.num_chunks == 1:
+            array = chunked.chunk(0)
+        else:
+            array = chunked.combine_chunks()
+
+        if metadata.get('class') == 'Time' or (not metadata and
+                                               pa.types.is_timestamp(array.type)):
+            col = _time_from_arrow(array, metadata)
+        else:
+            values, mask = _values_from_arrow(array)
+            if 'shape' in metadata:
+                values = values.reshape((len(array),) + tuple(metadata['shape']))
+                if mask is not None:
+                    mask = mask.reshape(values.shape)
+            if 'dtype' in metadata:
+                values = values.astype(metadata['dtype'])
+            unit = metadata.get('unit')
+            if mask is not None:
+                col = MaskedColumn(values, mask=mask, unit=unit, copy=False)
+            elif metadata.get('class') == 'Quantity':
+                col = u.Quantity(values, unit, copy=False)
+            else:
+                col = Column(values, unit=unit, copy=False)
+
+        if 'description' in metadata:
+            col.info.description = metadata['description']
+
+        columns.append(col)
+
+    table = QTable(columns, names=table.column_names, meta=meta, copy=False)
+
+    return cls(table, copy=False)
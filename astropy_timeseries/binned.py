@@ -1,7 +1,5 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
-from copy import deepcopy
-
 import numpy as np
 
 from astropy.table import groups, Table, QTable
@@ -9,7 +7,8 @@ from astropy.time import Time, TimeDelta
 from astropy import units as u
 from astropy.units import Quantity
 
-from .core import BaseTimeSeries
+from .core import (BaseTimeSeries, _copy_meta, _has_class_reader,
+                   _time_range_mask)
 
 __all__ = ['BinnedTimeSeries']
 
@@ -58,7 +57,9 @@ class BinnedTimeSeries(BaseTimeSeries):
         if time_bin_end is None and time_bin_size is None:
             raise TypeError("Either 'time_bin_size' or 'time_bin_end' should be specified")
 
-        if not isinstance(time_bin_start, Time):
+        # Relative (TimeDelta) start times are used for binned folded time
+        # series, so should not be converted to absolute times.
+        if not isinstance(time_bin_start, (Time, TimeDelta)):
             time_bin_start = Time(time_bin_start)
 
         if time_bin_end is not None and not isinstance(time_bin_end, Time):
@@ -154,8 +155,8 @@ class BinnedTimeSeries(BaseTimeSeries):
         if self._is_list_or_tuple_of_str(item):
             if 'time_bin_start' not in item or 'time_bin_size' not in item:
                 out = QTable([self[x] for x in item],
-                             meta=deepcopy(self.meta),
                              copy_indices=self._copy_indices)
+                out.meta = _copy_meta(self.meta)
                 out._groups = groups.TableGroups(out, indices=self.groups._indices,
                                                  keys=self.groups._keys)
                 return out
@@ -164,7 +165,7 @@ class BinnedTimeSeries(BaseTimeSeries):
     @classmethod
     def read(self, filename, time_bin_start_column=None, time_bin_end_column=None,
              time_bin_size_column=None, time_bin_size_unit=None, time_format=None, time_scale=None,
-             format=None, *args, **kwargs):
+             format=None, time_range=None, *args, **kwargs):
         """
         Read and parse a file and returns a `astropy_timeseries.BinnedTimeSeries`.
 
@@ -205,6 +206,13 @@ class BinnedTimeSeries(BaseTimeSeries):
             The time format for the start and end columns.
         time_scale: str, optional
             The time scale for the start and end columns.
+        time_range : tuple, optional
+            If specified, only the bins which overlap this ``(start, stop)``
+            range are returned, including the start time and excluding the
+            stop time. Either time can be `None` for an open-ended range. For
+            formats without a reader defined for the
+            `astropy_timeseries.BinnedTimeSeries` class, the bins are
+            selected after reading the file.
         *args : tuple, optional
             Positional arguments passed through to the data reader.
         **kwargs : dict, optional
@@ -217,23 +225,35 @@ class BinnedTimeSeries(BaseTimeSeries):
 
         """
 
-        try:
+        if _has_class_reader(self, filename, format, args, kwargs):
 
-            # First we try the readers defined for the BinnedTimeSeries class
+            # Use the readers defined for the BinnedTimeSeries class
+            if time_range is not None:
+                kwargs['time_range'] = time_range
             return super().read(filename, format=format, *args, **kwargs)
 
-        except TypeError:
-
-            # Otherwise we fall back to the default Table readers
+        # Otherwise we use the default Table readers
 
-            if time_bin_start_column is None:
-                raise ValueError("``time_bin_start_column`` should be provided since the default Table readers are being used.")
+        if time_bin_start_column is not None:
             if time_bin_end_column is None and time_bin_size_column is None:
                 raise ValueError("Either `time_bin_end_column` or `time_bin_size_column` should be provided.")
             elif time_bin_end_column is not None and time_bin_size_column is not None:
                 raise ValueError("Cannot specify both `time_bin_end_column` and `time_bin_size_column`.")
 
-            table = Table.read(filename, format=format, *args, **kwargs)
+        table = Table.read(filename, format=format, *args, **kwargs)
+
+        if time_bin_start_column is None:
+
+            # The bins may have been written as a Time column and a column
+            # with units, for example when writing a binned time series to an
+            # ECSV file.
+            if ('time_bin_start' in table.colnames and isinstance(table['time_bin_start'], Time) and
+                    'time_bin_size' in table.colnames and table['time_bin_size'].unit is not None):
+                binned = BinnedTimeSeries(table, copy=False)
+            else:
+                raise ValueError("``time_bin_start_column`` should be provided since the default Table readers are being used.")
+
+        else:
 
             if time_bin_start_column in table.colnames:
                 time_bin_start = Time(table.columns[time_bin_start_column],
@@ -270,8 +290,14 @@ class BinnedTimeSeries(BaseTimeSeries):
 
                 time_bin_end = None
 
-            return BinnedTimeSeries(data=table,
-                                    time_bin_start=time_bin_start,
-                                    time_bin_end=time_bin_end,
-                                    time_bin_size=time_bin_size,
-                                    n_bins=len(table))
+            binned = BinnedTimeSeries(data=table,
+                                      time_bin_start=time_bin_start,
+                                      time_bin_end=time_bin_end,
+                                      time_bin_size=time_bin_size,
+                                      n_bins=len(table))
+
+        if time_range is not None:
+            binned = binned[_time_range_mask(time_range, binned.time_bin_start,
+                                             binned.time_bin_end)]
+
+        return binned
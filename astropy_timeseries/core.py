@@ -1,9 +1,99 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
-from astropy.table import QTable
+from copy import deepcopy
+
+import numpy as np
+
+from astropy.io import registry
+from astropy.table import QTable, Table
+from astropy.time import Time
 
 __all__ = ['BaseTimeSeries']
 
+# Types of metadata values which cannot be modified in place, and therefore
+# never need to be copied.
+IMMUTABLE_TYPES = frozenset([str, bytes, int, float, complex, bool, type(None)])
+
+
+def _has_class_reader(cls, filename, format, args, kwargs):
+    """
+    Return whether a file should be read with a reader registered for a time
+    series class (such as the Kepler reader) rather than with a reader
+    inherited from `~astropy.table.Table`.
+
+    If ``format`` is `None`, the format is identified from the file in the
+    same way as in `~astropy.table.Table.read`. If no format, or several
+    formats, are identified, `False` is returned so that the error can be
+    raised by `~astropy.table.Table.read`.
+    """
+
+    if format is None:
+        formats = registry.identify_format('read', cls, filename, None,
+                                           (filename,) + tuple(args), kwargs)
+        if len(formats) != 1:
+            return False
+        format = formats[0]
+
+    try:
+        reader = registry.get_reader(format, cls)
+    except registry.IORegistryError:
+        return False
+
+    # get_reader also returns readers registered for parent classes, so we
+    # need to check whether the reader is the one registered for Table.
+    try:
+        return reader is not registry.get_reader(format, Table)
+    except registry.IORegistryError:
+        return True
+
+
+def _parse_time_range(time_range):
+    """
+    Check a ``(start, stop)`` time range given to the readers, returning the
+    start and stop times as `~astropy.time.Time` objects (either of which can
+    be `None` for an open-ended range).
+    """
+    if not isinstance(time_range, (tuple, list)) or len(time_range) != 2:
+        raise ValueError("time_range should be a (start, stop) tuple")
+    return tuple(None if time is None else Time(time) for time in time_range)
+
+
+def _time_range_mask(time_range, time, time_end=None):
+    """
+    Return a boolean mask selecting the samples with times in a time range,
+    including the start time and excluding the stop time. If ``time_end`` is
+    given, ``time`` and ``time_end`` are instead the start and end times of
+    bins, and the bins which overlap the time range are selected.
+    """
+    start, stop = _parse_time_range(time_range)
+    keep = np.ones(len(time), dtype=bool)
+    if start is not None:
+        if time_end is None:
+            keep &= time >= start
+        else:
+            keep &= time_end > start
+    if stop is not None:
+        keep &= time < stop
+    return keep
+
+
+def _copy_meta(meta):
+    """
+    Make a deep copy of the metadata of a time series, which is cheap even for
+    large FITS headers.
+
+    The values which cannot be modified in place, such as the strings and
+    numbers of FITS headers, are shared with the original metadata, and only
+    the other values, such as lists of header comments, are deep-copied.
+    """
+    copied = meta.copy()
+    # The memo keeps values which appear several times shared in the copy.
+    memo = {}
+    for key, value in meta.items():
+        if type(value) not in IMMUTABLE_TYPES:
+            copied[key] = deepcopy(value, memo)
+    return copied
+
 
 class BaseTimeSeries(QTable):
 
@@ -39,3 +129,59 @@ class BaseTimeSeries(QTable):
                                          .format(self.__class__.__name__, colname))
 
         return super().add_columns(cols, indexes=indexes, names=names, **kwargs)
+
+    def to_arrow(self, time_encoding='offset'):
+        """
+        Convert this time series to a :class:`pyarrow.Table`.
+
+        Numerical columns in the native byte order are converted without
+        copying, by sharing their buffers with the Arrow arrays. The units of
+        the columns, the time scales and formats and the table metadata are
+        stored as JSON in the Arrow metadata, so that the time series can be
+        reconstructed using :meth:`from_arrow`. This requires the `pyarrow
+        <https://arrow.apache.org/docs/python/>`_ package.
+
+        Parameters
+        ----------
+        time_encoding : {'offset', 'timestamp'}, optional
+            How the time columns are stored. With ``'offset'`` (the default),
+            times are stored as double precision offsets in days from a
+            reference Julian Date, which is stored in the metadata. With
+            ``'timestamp'``, times are stored as Arrow timestamps with a
+            nanosecond resolution, in the scale of the times (with a UTC time
+            zone for UTC times), which can be used by other Arrow-based tools.
+
+        Returns
+        -------
+        table : :class:`pyarrow.Table`
+            The Arrow table. Masked values are converted to nulls.
+        """
+        from .arrow import time_series_to_arrow
+        return time_series_to_arrow(self, time_encoding=time_encoding)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Convert a :class:`pyarrow.Table` to a time series.
+
+        Tables written by :meth:`to_arrow` are converted back with the same
+        units, time scales and formats and metadata. For other tables, Arrow
+        timestamp columns are converted to UTC times. Numerical columns
+        without null values share their buffers with the Arrow table and are
+        therefore read-only, and columns with null values are converted to
+        masked columns.
+
+        Parameters
+        ----------
+        table : :class:`pyarrow.Table`
+            The Arrow table, which should contain the columns required by the
+            time series class (for example ``time`` for
+            `~astropy_timeseries.TimeSeries`).
+
+        Returns
+        -------
+        time_series
+            The time series, of the class this method is called on.
+        """
+        from .arrow import time_series_from_arrow
+        return time_series_from_arrow(cls, table)
@@ -2,12 +2,14 @@ import warnings
 
 import numpy as np
 from astropy import units as u
+from astropy.time import Time, TimeDelta
 from astropy.utils.exceptions import AstropyUserWarning
 
-from .sampled import TimeSeries
+from .core import _copy_meta
+from .sampled import TimeSeries, _relative_time_sec
 from .binned import BinnedTimeSeries
 
-__all__ = ['simple_downsample']
+__all__ = ['simple_downsample', 'fold_downsample']
 
 
 def reduceat(array, indices, function):
@@ -87,7 +89,6 @@ def simple_downsample(time_series, time_bin_size, func=None, time_bin_start=None
     # Find the subset of the table that is inside the bins
     keep = ((relative_time_sec >= relative_bins_sec[0]) &
             (relative_time_sec < relative_bins_sec[-1]))
-    subset = sorted[keep]
 
     # Figure out which bin each row falls in - the -1 is because items
     # falling in the first bins will have index 1 but we want that to be 0
@@ -97,6 +98,118 @@ def simple_downsample(time_series, time_bin_size, func=None, time_bin_start=None
 
     # Create new binned time series
     binned = BinnedTimeSeries(time_bin_start=bins[:-1], time_bin_end=bins[-1])
+    binned.meta = _copy_meta(time_series.meta)
+
+    _add_binned_columns(binned, sorted, indices, n_bins, func, rows=keep)
+
+    return binned
+
+
+def fold_downsample(time_series, period, n_bins=None, time_bin_size=None,
+                    midpoint_epoch=None, func=None):
+    """
+    Fold a time series with a period and bin the values in phase.
+
+    This is equivalent to calling :meth:`~astropy_timeseries.TimeSeries.fold`
+    and then binning the values in the folded time series into bins of
+    relative time, but this is done in a single pass over the time offsets
+    without creating the intermediate folded time series.
+
+    Parameters
+    ----------
+    time_series : :class:`~astropy_timeseries.TimeSeries`
+        The time series to fold and bin.
+    period : `~astropy.units.Quantity`
+        The period to use for folding.
+    n_bins : int, optional
+        The number of bins to divide the period into. Either this or
+        ``time_bin_size`` should be specified.
+    time_bin_size : `~astropy.units.Quantity`, optional
+        The size of the bins. Either this or ``n_bins`` should be specified.
+    midpoint_epoch : `~astropy.time.Time`, optional
+        The time to use as the midpoint epoch, at which the relative time
+        offset will be 0. Defaults to the first time in the time series.
+    func : callable, optional
+        The function to use for combining points in the same bin. Defaults
+        to np.nanmean.
+
+    Returns
+    -------
+    binned_time_series : :class:`~astropy_timeseries.BinnedTimeSeries`
+        The binned time series, where the start times of the bins are
+        given as `~astropy.time.TimeDelta` values relative to the midpoint
+        epoch, and the first bin starts at minus half the period.
+    """
+
+    if not isinstance(time_series, TimeSeries):
+        raise TypeError("time_series should be a TimeSeries")
+
+    if not isinstance(period, u.Quantity):
+        raise TypeError("period should be a astropy.unit quantity")
+
+    if n_bins is None and time_bin_size is None:
+        raise TypeError("Either 'n_bins' or 'time_bin_size' should be specified")
+    elif n_bins is not None and time_bin_size is not None:
+        raise TypeError("Cannot specify both 'n_bins' and 'time_bin_size'")
+
+    period_sec = period.to_value(u.s)
+
+    if n_bins is None:
+        if not isinstance(time_bin_size, u.Quantity):
+            raise TypeError("time_bin_size should be a astropy.unit quantity")
+        bin_size_sec = time_bin_size.to_value(u.s)
+        n_bins = int(np.ceil(period_sec / bin_size_sec))
+    else:
+        bin_size_sec = period_sec / n_bins
+
+    if midpoint_epoch is None:
+        midpoint_epoch = time_series.time[0]
+    else:
+        midpoint_epoch = Time(midpoint_epoch)
+
+    if func is None:
+        func = np.nanmean
+
+    # Find the time since the start of the period containing each sample,
+    # and from this the bin each sample falls in.
+    relative_time_sec = _relative_time_sec(time_series.time, midpoint_epoch)
+    relative_time_sec += period_sec / 2
+    relative_time_sec %= period_sec
+
+    indices = phase_bin_indices(relative_time_sec, bin_size_sec, n_bins)
+
+    # Sort the samples by bin
+    order = np.argsort(indices, kind='stable')
+    indices = indices[order]
+
+    # Create new binned time series
+    time_bin_start = TimeDelta(np.arange(n_bins) * bin_size_sec - period_sec / 2, format='sec')
+    binned = BinnedTimeSeries(time_bin_start=time_bin_start,
+                              time_bin_size=bin_size_sec * u.s)
+    binned.meta = _copy_meta(time_series.meta)
+
+    _add_binned_columns(binned, time_series, indices, n_bins, func, rows=order)
+
+    return binned
+
+
+def phase_bin_indices(relative_time_sec, bin_size_sec, n_bins):
+    """
+    Return the index of the bin each sample falls in, given the time of each
+    sample since the start of the period (in the range [0, period)).
+    """
+    indices = (relative_time_sec // bin_size_sec).astype(int)
+    # Guard against round-off for times just below the end of the period
+    np.minimum(indices, n_bins - 1, out=indices)
+    return indices
+
+
+def _add_binned_columns(binned, time_series, indices, n_bins, func, rows=None):
+    """
+    Add the data columns of ``time_series`` to ``binned``, combining values
+    in the same bin with ``func``. ``indices`` gives the (sorted) bin index
+    of each of the rows selected with ``rows``.
+    """
 
     # Determine rows where values are defined
     groups = np.hstack([0, np.nonzero(np.diff(indices))[0] + 1])
@@ -107,18 +220,21 @@ def simple_downsample(time_series, time_bin_size, func=None, time_bin_start=None
 
     # Add back columns
 
-    for colname in subset.colnames:
+    for colname in time_series.colnames:
 
         if colname == 'time':
             continue
 
-        values = subset[colname]
+        values = time_series[colname]
 
         # FIXME: figure out how to avoid the following, if possible
         if not isinstance(values, (np.ndarray, u.Quantity)):
             warnings.warn("Skipping column {0} since it has a mix-in type", AstropyUserWarning)
             continue
 
+        if rows is not None:
+            values = values[rows]
+
         if isinstance(values, u.Quantity):
             data = u.Quantity(np.repeat(np.nan,  n_bins), unit=values.unit)
             data[unique_indices] = u.Quantity(reduceat(values.value, groups, func),
@@ -130,5 +246,3 @@ def simple_downsample(time_series, time_bin_size, func=None, time_bin_start=None
             data.mask[unique_indices] = 0
 
         binned[colname] = data
-
-    return binned
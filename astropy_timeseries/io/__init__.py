@@ -1 +1,5 @@
 from . import kepler  # noqa
+from . import native  # noqa
+from . import cache  # noqa
+from . import catalog  # noqa
+from . import parquet  # noqa
@@ -0,0 +1,149 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+An on-disk cache for time series read from files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from astropy import units as u
+
+from astropy_timeseries.io.native import native_reader, native_writer, HEADER_FILENAME
+
+__all__ = ["ReadCache"]
+
+
+class ReadCache:
+    """
+    An on-disk cache of time series read from files.
+
+    This can be passed to :meth:`TimeSeries.read
+    <astropy_timeseries.TimeSeries.read>` using the ``read_cache`` argument,
+    to avoid parsing the same files repeatedly. The time series read are
+    stored in the native format (see :mod:`astropy_timeseries.io.native`),
+    and are memory-mapped when reading them back from the cache, which means
+    that the columns of time series read from the cache are read-only.
+
+    The entries are identified by the path, size and modification time of
+    the files, as well as by the class of the time series read and the
+    options passed to the reader, so that modified files are read again.
+    When the total size of the cache exceeds ``max_size``, the least
+    recently used entries are removed.
+
+    Parameters
+    ----------
+    directory : str
+        The directory in which to store the cache. This is created if it
+        does not exist.
+    max_size : `~astropy.units.Quantity`, optional
+        The maximum size of the cache, in units of information (e.g.
+        ``u.GB``).
+    """
+
+    def __init__(self, directory, max_size=1 * u.GB):
+
+        if not isinstance(max_size, u.Quantity):
+            raise TypeError("max_size should be a Quantity")
+
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, cls, filename, **options):
+        """
+        Return the key identifying a file read as a time series of class
+        ``cls`` with the given options.
+        """
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        identity = json.dumps([cls.__module__ + '.' + cls.__qualname__,
+                               filename, stat.st_size, stat.st_mtime_ns,
+                               sorted((name, repr(value)) for name, value in options.items())])
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        Return the time series for a key, or `None` if it is not in the
+        cache.
+        """
+        path = self._path(key)
+        header = os.path.join(path, HEADER_FILENAME)
+        if not os.path.exists(header):
+            return None
+        # Record the access time for the eviction of least recently used
+        # entries, which does not rely on the file system recording access
+        # times.
+        os.utime(header)
+        return native_reader(path, memmap=True)
+
+    def put(self, key, time_series):
+        """
+        Store a time series in the cache.
+
+        Time series which cannot be written in the native format (for example
+        because the metadata is not JSON-serializable) are not stored.
+        """
+
+        # Write the entry to a temporary directory first, so that other
+        # processes never see an incomplete entry.
+        temporary = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+
+        try:
+            native_writer(time_series, temporary, overwrite=True)
+            os.rename(temporary, self._path(key))
+        except (TypeError, OSError):
+            # Either the time series cannot be written, or another process
+            # already stored an entry with the same key.
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def size(self):
+        """
+        Return the total size of the cache.
+        """
+        return sum(size for _, _, size in self._entries()) * u.byte
+
+    def _entries(self):
+        """
+        Return a list of (last access time, path, size) for all entries.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            header = os.path.join(path, HEADER_FILENAME)
+            if name.startswith('.') or not os.path.exists(header):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, filename))
+                       for filename in os.listdir(path))
+            entries.append((os.path.getmtime(header), path, size))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size of the
+        cache is below ``max_size``.
+        """
+        max_bytes = self.max_size.to_value(u.byte)
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        for _, path, _ in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,326 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+A catalog of Kepler and TESS light curve files, built from the FITS headers.
+
+Scanning a file only reads its headers and the first and last valid values of
+the time column, which are accessed through a memory map, so that large
+numbers of files can be indexed quickly. The catalog is stored in a SQLite
+database, which can then be queried to find the files to read.
+"""
+
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from astropy.io import fits
+
+from astropy_timeseries.core import _parse_time_range
+from astropy_timeseries.io.kepler import _light_curve_hdu
+
+__all__ = ["LightCurveCatalog"]
+
+COLUMNS = ['path', 'size', 'mtime_ns', 'telescope', 'object', 'target_id', 'quarter',
+           'sector', 'tstart', 'tstop', 'time_first', 'time_last', 'cadence', 'n_rows']
+
+# The size in bytes of the FITS binary table column formats
+FORMAT_SIZES = {'L': 1, 'B': 1, 'I': 2, 'J': 4, 'K': 8, 'A': 1, 'E': 4, 'D': 8,
+                'C': 8, 'M': 16, 'P': 8, 'Q': 16}
+
+TFORM = re.compile(r'^(\d*)([LXBIJKAEDCMPQ])')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    telescope TEXT,
+    object TEXT,
+    target_id INTEGER,
+    quarter INTEGER,
+    sector INTEGER,
+    tstart REAL,
+    tstop REAL,
+    time_first REAL,
+    time_last REAL,
+    cadence REAL,
+    n_rows INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_time ON files (time_first, time_last);
+CREATE INDEX IF NOT EXISTS files_object ON files (object COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_target_id ON files (target_id);
+"""
+
+
+def _keyword(headers, name):
+    """
+    Return the value of a keyword from the first header which contains it,
+    or `None`.
+    """
+    for header in headers:
+        value = header.get(name)
+        if value is not None and not isinstance(value, fits.card.Undefined):
+            return value
+    return None
+
+
+def _first_valid(values, indices):
+    """
+    Return the first value of ``values`` which is not NaN, trying the indices
+    in order, or `None` if all are NaN.
+    """
+    for index in indices:
+        value = values[index]
+        if not np.isnan(value):
+            return float(value)
+    return None
+
+
+def _time_values(hdu):
+    """
+    Return the time column of a light curve HDU.
+
+    Building the columns and data of a FITS table is slow compared to reading
+    the headers, so for uncompressed files with a double precision time
+    column, the location of the column is found from the ``TTYPEn`` and
+    ``TFORMn`` keywords and the column is memory-mapped directly.
+    """
+
+    header = hdu.header
+    fileinfo = hdu.fileinfo()
+
+    names = [header.get('TTYPE{0}'.format(index), '').strip().upper()
+             for index in range(1, header['TFIELDS'] + 1)]
+    time_index = names.index('T') if 'T' in names else names.index('TIME')
+
+    offset = 0
+    for index in range(1, time_index + 1):
+        match = TFORM.match(header['TFORM{0}'.format(index)].strip().upper())
+        if match is None:
+            offset = None
+            break
+        repeat, code = match.groups()
+        repeat = 1 if repeat == '' else int(repeat)
+        if code == 'X':
+            offset += (repeat + 7) // 8
+        else:
+            offset += repeat * FORMAT_SIZES[code]
+
+    time_format = header['TFORM{0}'.format(time_index + 1)].strip().upper()
+
+    if (offset is None or time_format not in ('D', '1D') or
+            fileinfo['file'].compression is not None or
+            'TSCAL{0}'.format(time_index + 1) in header or
+            'TZERO{0}'.format(time_index + 1) in header):
+        return hdu.data.field(time_index)
+
+    rows = np.memmap(fileinfo['file'].name, dtype=np.uint8, mode='r',
+                     offset=fileinfo['datLoc'], shape=(header['NAXIS2'], header['NAXIS1']))
+    return rows[:, offset:offset + 8].view('>f8')[:, 0]
+
+
+def _scan_file(filename):
+    """
+    Return the catalog row for a light curve file, returning the exception
+    raised instead of raising it if the file cannot be scanned.
+    """
+    try:
+        stat = os.stat(filename)
+        with fits.open(filename, memmap=True) as hdulist:
+
+            telescop, hdu = _light_curve_hdu(hdulist)
+            headers = [hdulist[0].header, hdu.header]
+
+            reference = hdu.header['BJDREFI'] + hdu.header['BJDREFF']
+
+            # Only the first and last valid times are accessed
+            time_values = _time_values(hdu)
+            n_rows = len(time_values)
+            time_first = _first_valid(time_values, range(n_rows))
+            time_last = _first_valid(time_values, range(n_rows - 1, -1, -1))
+
+            tstart = _keyword(headers, 'TSTART')
+            tstop = _keyword(headers, 'TSTOP')
+            cadence = _keyword(headers, 'TIMEDEL')
+
+            return OrderedDict([
+                ('path', filename),
+                ('size', stat.st_size),
+                ('mtime_ns', stat.st_mtime_ns),
+                ('telescope', telescop),
+                ('object', _keyword(headers, 'OBJECT')),
+                ('target_id', _keyword(headers, 'KEPLERID' if telescop == 'kepler' else 'TICID')),
+                ('quarter', _keyword(headers, 'QUARTER')),
+                ('sector', _keyword(headers, 'SECTOR')),
+                ('tstart', None if tstart is None else reference + tstart),
+                ('tstop', None if tstop is None else reference + tstop),
+                ('time_first', None if time_first is None else reference + time_first),
+                ('time_last', None if time_last is None else reference + time_last),
+                ('cadence', None if cadence is None else cadence * 86400.),
+                ('n_rows', n_rows)])
+
+    except Exception as exc:
+        return exc
+
+
+class LightCurveCatalog:
+    """
+    A catalog of Kepler and TESS light curve files, stored in a SQLite
+    database.
+
+    Files are added to the catalog with :meth:`scan`, which only reads the
+    FITS headers and the first and last valid times, and :meth:`query` can
+    then be used to find the files overlapping a time range or for a given
+    target, so that only these files need to be read.
+
+    For each file, the catalog records the telescope, the ``OBJECT``,
+    ``KEPLERID`` or ``TICID``, ``QUARTER`` and ``SECTOR`` keywords, the start
+    and stop times of the observations (``TSTART`` and ``TSTOP``), the first
+    and last valid times in the time column, the cadence (``TIMEDEL``, in
+    seconds) and the number of rows. Times are stored as Julian Dates in the
+    TDB scale.
+
+    Parameters
+    ----------
+    filename : str
+        The SQLite database file, which is created if it does not exist.
+        ``':memory:'`` can be used for a temporary in-memory catalog.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._connection = sqlite3.connect(filename)
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        """
+        Close the database.
+        """
+        self._connection.close()
+
+    def scan(self, filenames, workers=None):
+        """
+        Add light curve files to the catalog.
+
+        Files which are already in the catalog are only scanned again if their
+        size or modification time changed.
+
+        Parameters
+        ----------
+        filenames : iterable of str
+            The files to add.
+        workers : int, optional
+            If specified, the files are scanned in parallel using this number
+            of processes.
+
+        Returns
+        -------
+        errors : dict
+            A dictionary mapping the files that could not be scanned to the
+            exceptions raised.
+        """
+
+        known = dict((path, (size, mtime_ns)) for path, size, mtime_ns in
+                     self._connection.execute("SELECT path, size, mtime_ns FROM files"))
+
+        pending = []
+        errors = OrderedDict()
+
+        for filename in filenames:
+            filename = os.path.abspath(filename)
+            try:
+                stat = os.stat(filename)
+            except OSError as exc:
+                errors[filename] = exc
+                continue
+            if known.get(filename) != (stat.st_size, stat.st_mtime_ns):
+                pending.append(filename)
+
+        if workers is None or len(pending) == 0:
+            results = [_scan_file(filename) for filename in pending]
+        else:
+            chunksize = max(1, len(pending) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_scan_file, pending, chunksize=chunksize))
+
+        rows = []
+        for filename, result in zip(pending, results):
+            if isinstance(result, Exception):
+                errors[filename] = result
+            else:
+                rows.append(tuple(result.values()))
+
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO files ({0}) VALUES ({1})"
+                                         .format(', '.join(COLUMNS), ', '.join('?' * len(COLUMNS))),
+                                         rows)
+
+        return errors
+
+    def query(self, time_range=None, target=None, telescope=None):
+        """
+        Find the files in the catalog matching the given criteria.
+
+        Parameters
+        ----------
+        time_range : tuple, optional
+            If specified, only the files with valid times in this ``(start,
+            stop)`` range, including the start time and excluding the stop
+            time, are returned. Either time can be `None` for an open-ended
+            range.
+        target : str or int, optional
+            If specified, only the files for this target are returned. This
+            can either be the name of the target (the ``OBJECT`` keyword,
+            case-insensitive) or the Kepler or TIC identifier.
+        telescope : str, optional
+            If specified, only the files from this telescope (``'kepler'`` or
+            ``'tess'``, case-insensitive) are returned.
+
+        Returns
+        -------
+        paths : list of str
+            The paths of the matching files, sorted by time.
+        """
+
+        conditions = []
+        parameters = []
+
+        if time_range is not None:
+            start, stop = _parse_time_range(time_range)
+            if start is not None:
+                conditions.append("time_last >= ?")
+                parameters.append(float(start.tdb.jd))
+            if stop is not None:
+                conditions.append("time_first < ?")
+                parameters.append(float(stop.tdb.jd))
+
+        if target is not None:
+            if isinstance(target, str):
+                conditions.append("object = ? COLLATE NOCASE")
+            else:
+                conditions.append("target_id = ?")
+                target = int(target)
+            parameters.append(target)
+
+        if telescope is not None:
+            conditions.append("telescope = ?")
+            parameters.append(telescope.lower())
+
+        sql = "SELECT path FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY time_first, path"
+
+        return [path for path, in self._connection.execute(sql, parameters)]
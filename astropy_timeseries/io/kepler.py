@@ -1,42 +1,121 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 import warnings
+from collections import OrderedDict
 
 import numpy as np
 
+from astropy import units as u
 from astropy.io import registry, fits
-from astropy.table import Table
-from astropy.time import Time, TimeDelta
+from astropy.io.fits.connect import is_column_keyword, REMOVE_KEYWORDS
+from astropy.table import Column, MaskedColumn
+from astropy.time import Time
+from astropy.utils.exceptions import AstropyUserWarning
 
+from astropy_timeseries.core import _parse_time_range
 from astropy_timeseries.sampled import TimeSeries
 
-__all__ = ["kepler_fits_reader"]
+__all__ = ["kepler_fits_reader", "kepler_tpf_reader",
+           "kepler_fits_writer", "tess_fits_writer",
+           "QUALITY_NONE", "QUALITY_DEFAULT", "QUALITY_HARD", "QUALITY_HARDEST",
+           "QUALITY_BITMASKS"]
 
+# Presets for the bitmask applied to the quality flags, following the flag
+# definitions in the Kepler and TESS archive manuals.
 
-def kepler_fits_reader(filename):
+#: Do not reject any cadences
+QUALITY_NONE = 0
+
+#: Reject cadences during attitude tweaks (1), safe mode (2), coarse pointing
+#: (4), Earth pointing (8), reaction wheel desaturation events (32) and
+#: manually excluded cadences (128)
+QUALITY_DEFAULT = 1 | 2 | 4 | 8 | 32 | 128
+
+#: Also reject cadences flagged for events such as reaction wheel zero
+#: crossings, Argabrightening and cosmic rays (16 and 64), impulsive outliers
+#: (512) and cosmic rays in the collateral data (1024)
+QUALITY_HARD = QUALITY_DEFAULT | 16 | 64 | 512 | 1024
+
+#: Reject cadences with any quality flag set
+QUALITY_HARDEST = 2 ** 32 - 1
+
+QUALITY_BITMASKS = {'none': QUALITY_NONE,
+                    'default': QUALITY_DEFAULT,
+                    'hard': QUALITY_HARD,
+                    'hardest': QUALITY_HARDEST}
+
+# Units used in Kepler and TESS files which are not valid FITS units
+UNIT_REPLACEMENTS = {'e-/s': 'electron/s', 'pixels': 'pixel'}
+
+# Default reference times used by the writers if these are not in the
+# metadata of the time series
+BJDREF_DEFAULTS = {'kepler': (2454833, 0.), 'tess': (2457000, 0.)}
+
+
+def _select_rows(values, rows):
     """
-    This serves as the FITS reader for KEPLER or TESS files within astropy-timeseries.
+    Return the selected rows of a FITS table field as a new array with a
+    native byte order.
+    """
+    dtype = values.dtype.newbyteorder('=')
+    if isinstance(rows, slice):
+        return values[rows].astype(dtype)
+    out = np.empty((np.count_nonzero(rows),) + values.shape[1:], dtype=dtype)
+    return np.compress(rows, values, axis=0, out=out)
 
-    This allows reading a supported FITS file using syntax such as::
-    >>> from astropy_timeseries.sampled import TimeSeries
-    >>> timeseries = TimeSeries.read('<name of fits file>', format='kepler.fits')  # doctest: +SKIP
 
-    Parameters
-    ----------
-    filename: `str`, `pathlib.Path`
-        File to load.
+def _parse_quality_bitmask(quality_bitmask):
+    """
+    Return the integer bitmask corresponding to an integer or a preset name.
+    """
+    if isinstance(quality_bitmask, str):
+        if quality_bitmask not in QUALITY_BITMASKS:
+            raise ValueError("quality_bitmask should be an integer or one of "
+                             "'none', 'default', 'hard' or 'hardest'")
+        return QUALITY_BITMASKS[quality_bitmask]
+    return int(quality_bitmask)
 
-    Returns
-    -------
-    `astropy_timeseries.sampled.TimeSeries`
-        Data converted into a TimeSeries.
 
+def _nan_bisect_left(values, value):
     """
-    hdulist = fits.open(filename)
-    # Get the lightcurve HDU
+    Find the index at which ``value`` would be inserted in ``values`` to keep
+    it sorted, ignoring NaN values, which can be anywhere in ``values``. Only
+    a few values are accessed, so this can be used on memory-mapped data.
+    """
+    low, high = 0, len(values)
+    while low < high:
+        middle = (low + high) // 2
+        # Find the first value which is not NaN at or after the middle
+        probe = middle
+        while probe < high and np.isnan(values[probe]):
+            probe += 1
+        if probe < high and values[probe] < value:
+            low = probe + 1
+        else:
+            high = middle
+    return low
+
+
+def _time_offset(time, scale, header):
+    """
+    Return the time offset in days of a time relative to the reference time
+    of a Kepler or TESS file.
+    """
+    time = getattr(time, scale)
+    return (time.jd1 - header['BJDREFI']) + (time.jd2 - header['BJDREFF'])
+
+
+def _light_curve_hdu(hdulist, extname='LIGHTCURVE'):
+    """
+    Return the lowercase telescope name and the data HDU of a Kepler or TESS
+    file, checking that the file is supported. In TESS files, the data HDU is
+    found by name, which is ``LIGHTCURVE`` for light curves and ``PIXELS`` for
+    target pixel files.
+    """
+
     telescop = hdulist[0].header['telescop'].lower()
 
     if telescop == 'tess':
-        hdu = hdulist['LIGHTCURVE']
+        hdu = hdulist[extname]
     elif telescop == 'kepler':
         hdu = hdulist[1]
     else:
@@ -52,39 +131,510 @@ def kepler_fits_reader(filename):
         raise NotImplementedError("Support for {0} time scale not yet "
                                   "implemented in {1} reader".format(hdu.header['TIMESYS'], hdu.header['TELESCOP']))
 
-    tab = Table.read(hdu, format='fits')
+    return telescop, hdu
+
 
+def _time_column_name(fits_columns):
+    """
+    Return the name of the time column of a Kepler or TESS file.
+    """
     # Some KEPLER files have a T column instead of TIME.
-    if "T" in tab.colnames:
-        tab.rename_column("T", "TIME")
-
-    for colname in tab.colnames:
-        # Fix units
-        if tab[colname].unit == 'e-/s':
-            tab[colname].unit = 'electron/s'
-        if tab[colname].unit == 'pixels':
-            tab[colname].unit = 'pixel'
-
-        # Rename columns to lowercase
-        tab.rename_column(colname, colname.lower())
-
-    # Filter out NaN rows
-    nans = np.isnan(tab['time'].data)
-    if np.any(nans):
-        warnings.warn('Ignoring {0} rows with NaN times'.format(np.sum(nans)))
-    tab = tab[~nans]
-
-    # Time column is dependent on source and we correct it here
-    reference_date = Time(hdu.header['BJDREFI'], hdu.header['BJDREFF'],
-                          scale=hdu.header['TIMESYS'].lower(), format='jd')
-    time = reference_date + TimeDelta(tab['time'].data)
+    return 'T' if 'T' in fits_columns.names else 'TIME'
+
+
+def _column_names(fits_columns, time_name, columns):
+    """
+    Return the names of the FITS columns to read, given the requested column
+    names (case-insensitive), always including the time column.
+    """
+    if columns is None:
+        return fits_columns.names
+    upper_names = {name.upper(): name for name in fits_columns.names}
+    names = [time_name]
+    for name in columns:
+        if name.upper() not in upper_names:
+            raise ValueError("Column '{}' not found in the input data.".format(name))
+        name = upper_names[name.upper()]
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _time_range_data(data, time_name, header, time_range):
+    """
+    Return the rows of the data in a time range. The rows are found by
+    bisecting the raw time column, so that only a few values are read from
+    the file, and are selected with a slice.
+    """
+    scale = header['TIMESYS'].lower()
+    start, stop = _parse_time_range(time_range)
+    time_values = data.field(time_name)
+    first, last = 0, len(time_values)
+    if start is not None:
+        first = _nan_bisect_left(time_values, _time_offset(start, scale, header))
+    if stop is not None:
+        last = max(first, _nan_bisect_left(time_values, _time_offset(stop, scale, header)))
+    return data[first:last]
+
+
+def _column_unit(fits_column):
+    """
+    Return the unit of a FITS column, fixing units which are not valid FITS
+    units.
+    """
+    if fits_column.unit in UNIT_REPLACEMENTS:
+        return u.Unit(UNIT_REPLACEMENTS[fits_column.unit])
+    elif fits_column.unit is not None:
+        return u.Unit(fits_column.unit, format='fits', parse_strict='silent')
+
+
+def _table_column(fits_column, values, name):
+    """
+    Return a table column for the values of a FITS column, masking null
+    values.
+    """
+    if fits_column.null is None:
+        return Column(values, name=name, unit=_column_unit(fits_column), copy=False)
+    else:
+        return MaskedColumn(values, name=name, mask=values == fits_column.null,
+                            unit=_column_unit(fits_column), copy=False)
+
+
+def _table_time(time_column, header):
+    """
+    Return the times for the raw values of a time column, which are modified
+    in place.
+    """
+    # Time column is dependent on source and we correct it here. The
+    # integer part of the reference date is passed separately so that the
+    # times are not rounded.
+    if header['BJDREFF'] != 0:
+        time_column += header['BJDREFF']
+    time = Time(time_column, header['BJDREFI'],
+                scale=header['TIMESYS'].lower(), format='jd', copy=False)
     time.format = 'isot'
+    return time
+
+
+def _table_meta(header):
+    """
+    Return the table metadata from a FITS table header, omitting the
+    keywords describing the table structure and columns, as done by
+    `~astropy.table.Table.read`.
+    """
+    meta = OrderedDict()
+    for key, value, comment in header.cards:
+        if key in ('COMMENT', 'HISTORY'):
+            meta.setdefault('comments' if key == 'COMMENT' else key, []).append(value)
+        elif key in meta:
+            if isinstance(meta[key], list):
+                meta[key].append(value)
+            else:
+                meta[key] = [meta[key], value]
+        elif not is_column_keyword(key) and key not in REMOVE_KEYWORDS:
+            meta[key] = value
+    return meta
+
+
+def kepler_fits_reader(filename, columns=None, time_range=None, quality_bitmask=None):
+    """
+    This serves as the FITS reader for KEPLER or TESS files within astropy-timeseries.
+
+    This allows reading a supported FITS file using syntax such as::
+    >>> from astropy_timeseries.sampled import TimeSeries
+    >>> timeseries = TimeSeries.read('<name of fits file>', format='kepler.fits')  # doctest: +SKIP
+
+    The file is memory-mapped, and only the requested columns are read and
+    converted.
+
+    Parameters
+    ----------
+    filename: `str`, `pathlib.Path`
+        File to load.
+    columns: list of str, optional
+        The names of the columns to read (case-insensitive). The time column
+        is always read. By default, all columns are read.
+    time_range: tuple, optional
+        If specified, only the rows with times in this ``(start, stop)`` range
+        are read, including the start time and excluding the stop time. Either
+        time can be `None` for an open-ended range. The rows are found by
+        bisecting the time column in the file, which should be sorted.
+    quality_bitmask: int or str, optional
+        If specified, the rows for which any of the bits of this bitmask is
+        set in the quality flags (the ``SAP_QUALITY`` column for Kepler files
+        and the ``QUALITY`` column for TESS files) are not read. This can be
+        an integer or one of the presets ``'none'``, ``'default'``, ``'hard'``
+        and ``'hardest'`` (see ``QUALITY_BITMASKS``).
+
+    Returns
+    -------
+    `astropy_timeseries.sampled.TimeSeries`
+        Data converted into a TimeSeries.
+
+    """
+    with fits.open(filename, memmap=True) as hdulist:
+
+        telescop, hdu = _light_curve_hdu(hdulist)
+
+        fits_columns = hdu.columns
+
+        time_name = _time_column_name(fits_columns)
+
+        names = _column_names(fits_columns, time_name, columns)
+
+        data = hdu.data
+
+        if time_range is not None:
+            data = _time_range_data(data, time_name, hdu.header, time_range)
+
+        # Find the rows to keep. If these are contiguous (which is usually the
+        # case, as NaN times are at the start or end of the data), they are
+        # selected with a slice, which avoids indexing with a mask.
+        time_values = data.field(time_name)
+        valid = ~np.isnan(time_values)
+        n_invalid = len(valid) - np.count_nonzero(valid)
+        if n_invalid > 0:
+            warnings.warn('Ignoring {0} rows with NaN times'.format(n_invalid))
+
+        if quality_bitmask is not None:
+            bitmask = _parse_quality_bitmask(quality_bitmask)
+            quality_name = 'SAP_QUALITY' if telescop == 'kepler' else 'QUALITY'
+            if quality_name not in fits_columns.names:
+                raise ValueError("Quality column '{}' not found in the input data.".format(quality_name))
+            if bitmask != 0:
+                # Cast to a wider type so that all 32 bits of the flags can be
+                # tested regardless of the sign of the values.
+                valid &= (data.field(quality_name).astype(np.int64) & bitmask) == 0
+
+        if np.all(valid):
+            rows = slice(None)
+        else:
+            valid_rows = np.nonzero(valid)[0]
+            if len(valid_rows) > 0 and valid_rows[-1] - valid_rows[0] == len(valid_rows) - 1:
+                rows = slice(valid_rows[0], valid_rows[-1] + 1)
+            else:
+                rows = valid
 
-    # Remove original time column
-    tab.remove_column('time')
+        # Build the final columns in a single pass. Only the requested fields
+        # of the memory-mapped data are accessed, and the selected rows of each
+        # are copied once into a native byte order array, so that the file can
+        # be closed.
+        time_column = None
+        table_columns = []
+        for name in names:
 
-    return TimeSeries(time=time, data=tab)
+            values = _select_rows(data.field(name), rows)
+
+            if name == time_name:
+                time_column = values
+                continue
+
+            table_columns.append(_table_column(fits_columns[name], values, name.lower()))
+
+        meta = _table_meta(hdu.header)
+
+        time = _table_time(time_column, hdu.header)
+
+    return TimeSeries(time=time, data=table_columns, meta=meta, copy=False)
+
+
+def kepler_tpf_reader(filename, columns=None, time_range=None):
+    """
+    Read a Kepler or TESS target pixel file.
+
+    This allows reading a target pixel file using syntax such as::
+
+        >>> from astropy_timeseries.sampled import TimeSeries
+        >>> timeseries = TimeSeries.read('<name of fits file>', format='tess.tpf')  # doctest: +SKIP
+
+    The image columns (such as ``flux``) are returned as ``(n_cadences, ny,
+    nx)`` arrays which are memory-mapped from the file, so that reading a
+    target pixel file is fast regardless of its size, and the pixels are only
+    read from disk when they are accessed. For example, slicing the time
+    series or the image columns by cadence only reads the corresponding
+    cadences, which allows processing the cadences in chunks. Modifying the
+    memory-mapped columns does not modify the file.
+
+    Rows with NaN times at the start or end of the data are not read. To
+    avoid copying the image columns, rows with NaN times elsewhere are kept,
+    with masked times.
+
+    Parameters
+    ----------
+    filename: `str`, `pathlib.Path`
+        File to load.
+    columns: list of str, optional
+        The names of the columns to read (case-insensitive). The time column
+        is always read. By default, all columns are read.
+    time_range: tuple, optional
+        If specified, only the rows with times in this ``(start, stop)`` range
+        are read, including the start time and excluding the stop time. Either
+        time can be `None` for an open-ended range.
+
+    Returns
+    -------
+    `astropy_timeseries.sampled.TimeSeries`
+        Data converted into a TimeSeries.
+    """
+    with fits.open(filename, memmap=True) as hdulist:
+
+        telescop, hdu = _light_curve_hdu(hdulist, extname='PIXELS')
+
+        fits_columns = hdu.columns
+
+        time_name = _time_column_name(fits_columns)
+
+        names = _column_names(fits_columns, time_name, columns)
+
+        data = hdu.data
+
+        if time_range is not None:
+            data = _time_range_data(data, time_name, hdu.header, time_range)
+
+        # The rows are always selected with a slice, so that the image columns
+        # are not copied.
+        valid = ~np.isnan(data.field(time_name))
+        valid_rows = np.nonzero(valid)[0]
+        if len(valid_rows) == 0:
+            rows = slice(0, 0)
+        else:
+            rows = slice(valid_rows[0], valid_rows[-1] + 1)
+
+        n_invalid = len(valid) - (rows.stop - rows.start)
+        if n_invalid > 0:
+            warnings.warn('Ignoring {0} rows with NaN times'.format(n_invalid))
+
+        invalid = ~valid[rows]
+        n_masked = np.count_nonzero(invalid)
+        if n_masked > 0:
+            warnings.warn('Masking {0} rows with NaN times'.format(n_masked))
+
+        time_column = None
+        table_columns = []
+        for name in names:
+
+            values = data.field(name)[rows]
+
+            if name == time_name:
+                time_column = _select_rows(values, slice(None))
+                continue
+
+            if values.ndim > 1:
+                # Image columns are kept as views of the memory-mapped data,
+                # which remains accessible after the file is closed. Null
+                # values are not masked, since this would read the whole
+                # column.
+                column = Column(values, name=name.lower(), unit=_column_unit(fits_columns[name]),
+                                copy=False)
+            else:
+                column = _table_column(fits_columns[name], _select_rows(values, slice(None)),
+                                       name.lower())
+
+            table_columns.append(column)
+
+        meta = _table_meta(hdu.header)
+
+        # Time does not accept NaN values, so these are replaced before
+        # masking them
+        if n_masked > 0:
+            time_column[invalid] = 0.
+        time = _table_time(time_column, hdu.header)
+        if n_masked > 0:
+            time[invalid] = np.ma.masked
+
+    return TimeSeries(time=time, data=table_columns, meta=meta, copy=False)
+
+
+def _fits_unit(unit):
+    """
+    Return the string for a unit in a Kepler or TESS file.
+    """
+    for original, replacement in UNIT_REPLACEMENTS.items():
+        if unit == u.Unit(replacement):
+            return original
+    try:
+        return unit.to_string(format='fits')
+    except ValueError:
+        return unit.to_string()
+
+
+def _null_value(values, mask):
+    """
+    Return a value which fits in the integer dtype of a column and does not
+    occur in its unmasked values, to be used as the null value of the column.
+    The minimum or maximum value of the dtype is used if possible.
+    """
+
+    info = np.iinfo(values.dtype)
+    valid = values[~mask]
+
+    for null in (info.min, info.max):
+        if not np.any(valid == null):
+            return null
+
+    # Both extreme values are used, so any gap between the sorted unique
+    # values gives an unused value.
+    used = np.unique(valid)
+    gaps = np.nonzero(used[1:] - 1 > used[:-1])[0]
+    if len(gaps) == 0:
+        raise ValueError("Masked column uses all the values of its dtype ({0}), so no "
+                         "null value can be written".format(values.dtype))
+
+    return used[gaps[0]] + 1
+
+
+def _column_values(name, col):
+    """
+    Return the values, unit string and null value to write for a time series
+    column.
+    """
+
+    unit = None
+    null = None
+
+    if isinstance(col, u.Quantity):
+        values = col.value
+        unit = col.unit
+    elif isinstance(col, MaskedColumn):
+        unit = col.unit
+        if not np.any(col.mask):
+            values = col.data.data
+        elif col.dtype.kind == 'f':
+            values = col.filled(np.nan)
+        elif col.dtype.kind in 'iu':
+            null = _null_value(col.data.data, col.mask)
+            values = col.filled(null)
+        else:
+            values = col.filled()
+    elif isinstance(col, Column):
+        values = col.data
+        unit = col.unit
+    else:
+        raise TypeError("Column '{0}' of type {1} cannot be written in the Kepler or "
+                        "TESS format".format(name, col.__class__.__name__))
+
+    return np.asarray(values), None if unit is None else _fits_unit(unit), null
+
+
+def _write_light_curve(time_series, filename, telescop, overwrite):
+    """
+    Write a time series as a Kepler or TESS light curve file.
+    """
+
+    meta = time_series.meta
+
+    bjdrefi, bjdreff = BJDREF_DEFAULTS[telescop]
+    if 'BJDREFI' in meta and 'BJDREFF' in meta:
+        bjdrefi, bjdreff = int(meta['BJDREFI']), float(meta['BJDREFF'])
+
+    header = fits.Header()
+
+    for key, value in meta.items():
+        if is_column_keyword(key.upper()) or key.upper() in REMOVE_KEYWORDS:
+            warnings.warn("Meta-data keyword {0} will be ignored since it conflicts "
+                          "with a FITS reserved keyword".format(key), AstropyUserWarning)
+            continue
+        if key == 'comments':
+            key = 'COMMENT'
+        try:
+            if isinstance(value, list):
+                for item in value:
+                    header.append((key, item))
+            else:
+                header[key] = value
+        except ValueError:
+            warnings.warn("Attribute `{0}` of type {1} cannot be added to FITS Header - "
+                          "skipping".format(key, type(value)), AstropyUserWarning)
+
+    header['TELESCOP'] = telescop.upper()
+    header['TIMESYS'] = 'TDB'
+    header['TIMEUNIT'] = 'd'
+    header['BJDREFI'] = bjdrefi
+    header['BJDREFF'] = bjdreff
+
+    # The time is encoded as days relative to the reference time, computed
+    # from the two-part Julian dates to avoid losing precision.
+    time = _time_offset(time_series.time, 'tdb', header)
+
+    names = ['TIME']
+    arrays = [time]
+    units = ['BJD - {0}'.format(bjdrefi)]
+    nulls = [None]
+
+    for name in time_series.colnames[1:]:
+        values, unit, null = _column_values(name, time_series[name])
+        names.append(name.upper())
+        arrays.append(values)
+        units.append(unit)
+        nulls.append(null)
+
+    # All the columns are copied once into a single record array. If the
+    # values of all the columns are stored in FITS as they are in memory
+    # (other than the byte order), the array is created big-endian and used
+    # as it is for the binary table, so that the data is neither copied nor
+    # byte-swapped again when writing. Otherwise, the conversions are left to
+    # astropy.io.fits.
+    raw = all(array.dtype.kind in 'fcS' or (array.dtype.kind == 'i' and array.dtype.itemsize > 1)
+              for array in arrays)
+    data = np.empty(len(time), dtype=[(name, array.dtype.newbyteorder('>') if raw else array.dtype,
+                                       array.shape[1:]) for name, array in zip(names, arrays)])
+    for name, array in zip(names, arrays):
+        data[name] = array
+
+    if raw:
+        data = data.view(fits.FITS_rec)
+
+    hdu = fits.BinTableHDU(data=data, header=header, name='LIGHTCURVE', ver=1)
+
+    for fits_column, unit, null in zip(hdu.columns, units, nulls):
+        if unit is not None:
+            fits_column.unit = unit
+        if null is not None:
+            fits_column.null = null
+
+    primary = fits.PrimaryHDU()
+    primary.header['TELESCOP'] = telescop.upper()
+
+    fits.HDUList([primary, hdu]).writeto(filename, overwrite=overwrite)
+
+
+def kepler_fits_writer(time_series, filename, overwrite=False):
+    """
+    Write a time series as a Kepler light curve file, which can be read back
+    with ``format='kepler.fits'``.
+
+    The times are written as days relative to the reference time given by
+    the ``BJDREFI`` and ``BJDREFF`` keywords in the metadata of the time
+    series, which are set when reading Kepler files (the Kepler reference
+    time is used otherwise), and all columns are written in a single binary
+    table. The metadata is written to the header of the table.
+
+    Parameters
+    ----------
+    time_series : `~astropy_timeseries.TimeSeries`
+        The time series to write.
+    filename : str
+        The file to write.
+    overwrite : bool, optional
+        Whether to overwrite the file if it exists.
+    """
+    _write_light_curve(time_series, filename, 'kepler', overwrite)
+
+
+def tess_fits_writer(time_series, filename, overwrite=False):
+    """
+    Write a time series as a TESS light curve file, which can be read back
+    with ``format='tess.fits'``.
+
+    See `kepler_fits_writer` for details - the TESS reference time is used if
+    the ``BJDREFI`` and ``BJDREFF`` keywords are not in the metadata.
+    """
+    _write_light_curve(time_series, filename, 'tess', overwrite)
 
 
 registry.register_reader('kepler.fits', TimeSeries, kepler_fits_reader)
 registry.register_reader('tess.fits', TimeSeries, kepler_fits_reader)
+registry.register_reader('kepler.tpf', TimeSeries, kepler_tpf_reader)
+registry.register_reader('tess.tpf', TimeSeries, kepler_tpf_reader)
+registry.register_writer('kepler.fits', TimeSeries, kepler_fits_writer)
+registry.register_writer('tess.fits', TimeSeries, tess_fits_writer)
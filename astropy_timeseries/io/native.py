@@ -0,0 +1,218 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+A native on-disk format for time series, which can be read without parsing.
+
+A time series is stored as a directory containing a ``header.json`` file,
+which describes the columns and contains the table metadata, and one ``.npy``
+file per array. Time columns are stored as the two parts of the Julian dates
+along with the time scale and format, so that they can be reconstructed
+exactly without parsing strings.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.io import registry
+from astropy.table import Column, MaskedColumn, QTable
+from astropy.time import Time
+
+from astropy_timeseries.sampled import TimeSeries
+from astropy_timeseries.binned import BinnedTimeSeries
+
+__all__ = ["native_reader", "native_writer"]
+
+HEADER_FILENAME = 'header.json'
+
+FORMAT_VERSION = 1
+
+
+def _save_array(dirname, filename, array):
+    array = np.asanyarray(array)
+    if array.dtype.kind == 'O':
+        raise TypeError("Arrays with an object dtype cannot be written in the native format")
+    np.save(os.path.join(dirname, filename), np.ascontiguousarray(array), allow_pickle=False)
+    return filename
+
+
+def _load_array(dirname, filename, memmap):
+    return np.load(os.path.join(dirname, filename), mmap_mode='r' if memmap else None,
+                   allow_pickle=False)
+
+
+def native_writer(time_series, dirname, overwrite=False):
+    """
+    Write a time series in the native format.
+
+    Parameters
+    ----------
+    time_series : `~astropy_timeseries.TimeSeries` or `~astropy_timeseries.BinnedTimeSeries`
+        The time series to write.
+    dirname : str
+        The directory to write the time series to.
+    overwrite : bool, optional
+        Whether to replace the directory, and all the files in it, if it
+        already exists.
+    """
+
+    if os.path.exists(dirname) and not overwrite:
+        raise OSError("Directory {0} already exists. If you mean to replace it "
+                      "then use the argument overwrite=True.".format(dirname))
+
+    # The time series is written to a new directory in a staging directory
+    # next to the final one, and only renamed once complete, so that an
+    # incomplete directory cannot be read and no files from a previous time
+    # series are left behind. Time series memory-mapped from a previous
+    # directory also remain valid, since its files are removed rather than
+    # rewritten.
+    path = os.path.abspath(dirname)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.' + os.path.basename(path) + '-')
+
+    try:
+        new = os.path.join(staging, 'new')
+        os.mkdir(new)
+        _write_directory(time_series, new)
+        if os.path.exists(path):
+            os.rename(path, os.path.join(staging, 'old'))
+        os.rename(new, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _write_directory(time_series, dirname):
+
+    columns = []
+
+    for index, name in enumerate(time_series.colnames):
+
+        col = time_series[name]
+        prefix = 'column_{0}'.format(index)
+        header = OrderedDict([('name', name)])
+
+        if isinstance(col, Time):
+            header['class'] = 'Time'
+            header['jd1'] = _save_array(dirname, prefix + '_jd1.npy', col.jd1)
+            header['jd2'] = _save_array(dirname, prefix + '_jd2.npy', col.jd2)
+            header['scale'] = col.scale
+            header['format'] = col.format
+            header['precision'] = col.precision
+            if col.location is not None:
+                if not col.location.isscalar:
+                    raise TypeError("Time columns with non-scalar locations cannot be "
+                                    "written in the native format")
+                geocentric = col.location.geocentric.to_value(u.m)
+                header['location'] = [float(value) for value in geocentric]
+        elif isinstance(col, u.Quantity):
+            header['class'] = 'Quantity'
+            header['data'] = _save_array(dirname, prefix + '.npy', col.value)
+            header['unit'] = col.unit.to_string()
+        elif isinstance(col, Column):
+            if isinstance(col, MaskedColumn):
+                header['class'] = 'MaskedColumn'
+                header['mask'] = _save_array(dirname, prefix + '_mask.npy', col.mask)
+                header['data'] = _save_array(dirname, prefix + '.npy', col.data.data)
+            else:
+                header['class'] = 'Column'
+                header['data'] = _save_array(dirname, prefix + '.npy', col.data)
+            header['unit'] = None if col.unit is None else col.unit.to_string()
+        else:
+            raise TypeError("Column '{0}' of type {1} cannot be written in the native "
+                            "format".format(name, col.__class__.__name__))
+
+        if col.info.description is not None:
+            header['description'] = col.info.description
+
+        columns.append(header)
+
+    header = OrderedDict([('version', FORMAT_VERSION),
+                          ('class', time_series.__class__.__name__),
+                          ('columns', columns),
+                          ('meta', time_series.meta)])
+
+    try:
+        header = json.dumps(header, indent=2)
+    except TypeError:
+        raise TypeError("The metadata should be JSON-serializable to be written in "
+                        "the native format")
+
+    with open(os.path.join(dirname, HEADER_FILENAME), 'w') as f:
+        f.write(header)
+
+
+def native_reader(dirname, memmap=True):
+    """
+    Read a time series written in the native format.
+
+    The arrays are memory-mapped by default, so that only the parts of the
+    columns which are accessed are read from disk. The time columns are
+    reconstructed from the two parts of the Julian dates without parsing.
+
+    Parameters
+    ----------
+    dirname : str
+        The directory the time series was written to.
+    memmap : bool, optional
+        Whether to memory-map the arrays (the default) or to read them into
+        memory. Memory-mapped columns are read-only.
+
+    Returns
+    -------
+    `~astropy_timeseries.TimeSeries` or `~astropy_timeseries.BinnedTimeSeries`
+        The time series, of the same class as the one written.
+    """
+
+    with open(os.path.join(dirname, HEADER_FILENAME)) as f:
+        header = json.load(f, object_pairs_hook=OrderedDict)
+
+    if header['version'] > FORMAT_VERSION:
+        raise ValueError("Native format version {0} is not supported".format(header['version']))
+
+    columns = []
+
+    for column in header['columns']:
+
+        if column['class'] == 'Time':
+            location = column.get('location')
+            if location is not None:
+                location = EarthLocation.from_geocentric(*location, unit=u.m)
+            col = Time(_load_array(dirname, column['jd1'], memmap),
+                       _load_array(dirname, column['jd2'], memmap),
+                       format='jd', scale=column['scale'], precision=column['precision'],
+                       location=location, copy=False)
+            col.format = column['format']
+        elif column['class'] == 'Quantity':
+            col = u.Quantity(_load_array(dirname, column['data'], memmap),
+                             column['unit'], copy=False)
+        elif column['class'] == 'MaskedColumn':
+            col = MaskedColumn(_load_array(dirname, column['data'], memmap),
+                               mask=_load_array(dirname, column['mask'], memmap),
+                               unit=column['unit'], copy=False)
+        else:
+            col = Column(_load_array(dirname, column['data'], memmap),
+                         unit=column['unit'], copy=False)
+
+        if 'description' in column:
+            col.info.description = column['description']
+
+        columns.append(col)
+
+    table = QTable(columns, names=[column['name'] for column in header['columns']],
+                   meta=header['meta'], copy=False)
+
+    cls = BinnedTimeSeries if header['class'] == 'BinnedTimeSeries' else TimeSeries
+
+    return cls(table, copy=False)
+
+
+registry.register_reader('native', TimeSeries, native_reader)
+registry.register_reader('native', BinnedTimeSeries, native_reader)
+registry.register_writer('native', TimeSeries, native_writer)
+registry.register_writer('native', BinnedTimeSeries, native_writer)
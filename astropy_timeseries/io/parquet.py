@@ -0,0 +1,249 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Reading and writing time series in the Apache Parquet format.
+
+The time series are converted to Arrow tables (see
+:meth:`~astropy_timeseries.TimeSeries.to_arrow`), with times stored as double
+precision offsets in days from a reference Julian Date, and are written sorted
+by time. Parquet files record the minimum and maximum values of each column in
+each row group, so that when reading a time range, the row groups which do not
+overlap the range can be skipped without reading them. Only the requested
+columns are read.
+
+This requires the `pyarrow <https://arrow.apache.org/docs/python/>`_ package.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from astropy import units as u
+from astropy.io import registry
+
+from astropy_timeseries.core import _parse_time_range, _time_range_mask
+from astropy_timeseries.arrow import FIELD_KEY, SCHEMA_KEY
+from astropy_timeseries.sampled import TimeSeries
+from astropy_timeseries.binned import BinnedTimeSeries
+
+__all__ = ["parquet_reader", "parquet_writer"]
+
+# Margin in days used when comparing time offsets with the row group
+# statistics, so that rounding errors cannot cause row groups with times at the
+# edges of the time range to be skipped. The rows are then selected exactly.
+OFFSET_MARGIN = 1e-6 / 86400.
+
+
+def _field_metadata(field):
+    if field.metadata is None or FIELD_KEY not in field.metadata:
+        return {}
+    return json.loads(field.metadata[FIELD_KEY].decode('utf-8'))
+
+
+def _time_offset(time, metadata):
+    """
+    Return the offset in days of a time from the reference Julian Date of a
+    time column written with the offset encoding.
+    """
+    time = getattr(time, metadata['scale'])
+    return (time.jd1 - metadata['reference']) + time.jd2
+
+
+def _row_groups(parquet_file, start_name, size_name, time_range):
+    """
+    Return the indices of the row groups which may contain samples (or bins)
+    in a time range, using the minimum and maximum times recorded for each row
+    group. For binned time series, ``size_name`` is the name of the bin size
+    column, and the row groups containing bins overlapping the time range are
+    returned.
+    """
+
+    schema = parquet_file.schema_arrow
+    metadata = parquet_file.metadata
+
+    start_metadata = _field_metadata(schema.field(start_name))
+    if start_metadata.get('encoding') != 'offset':
+        return list(range(metadata.num_row_groups))
+
+    if size_name is None:
+        size_metadata = None
+    else:
+        size_metadata = _field_metadata(schema.field(size_name))
+        if size_metadata.get('class') != 'Quantity':
+            return list(range(metadata.num_row_groups))
+
+    start, stop = _parse_time_range(time_range)
+    if start is not None:
+        start = _time_offset(start, start_metadata) - OFFSET_MARGIN
+    if stop is not None:
+        stop = _time_offset(stop, start_metadata) + OFFSET_MARGIN
+
+    row_groups = []
+
+    for index in range(metadata.num_row_groups):
+
+        row_group = metadata.row_group(index)
+        statistics = dict((row_group.column(column).path_in_schema,
+                           row_group.column(column).statistics)
+                          for column in range(row_group.num_columns))
+
+        start_statistics = statistics.get(start_name)
+        if start_statistics is None or not start_statistics.has_min_max:
+            row_groups.append(index)
+            continue
+
+        last = start_statistics.max
+        if size_name is not None:
+            # The bins end at most at the last start time plus the largest
+            # bin size.
+            size_statistics = statistics.get(size_name)
+            if size_statistics is None or not size_statistics.has_min_max:
+                row_groups.append(index)
+                continue
+            last += (size_statistics.max * u.Unit(size_metadata['unit'])).to_value(u.day)
+
+        if start is not None and last < start:
+            continue
+        if stop is not None and start_statistics.min >= stop:
+            continue
+
+        row_groups.append(index)
+
+    return row_groups
+
+
+def parquet_writer(time_series, filename, overwrite=False, row_group_size=100000,
+                   compression='snappy'):
+    """
+    Write a time series to a Parquet file.
+
+    The rows are sorted by time if needed, and written in row groups of
+    ``row_group_size`` rows, for which the minimum and maximum times are
+    recorded in the file. The units of the columns, the time scales and
+    formats and the table metadata (which should be JSON-serializable) are
+    stored in the metadata of the file.
+
+    Parameters
+    ----------
+    time_series : `~astropy_timeseries.TimeSeries` or `~astropy_timeseries.BinnedTimeSeries`
+        The time series to write.
+    filename : str
+        The file to write the time series to.
+    overwrite : bool, optional
+        Whether to overwrite the file if it exists.
+    row_group_size : int, optional
+        The number of rows in each row group. Smaller row groups allow reading
+        narrower time ranges without reading unneeded rows, at the cost of
+        a larger file.
+    compression : str, optional
+        The compression codec to use, such as ``'snappy'`` (the default),
+        ``'gzip'``, ``'zstd'`` or ``'none'``.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if os.path.exists(filename) and not overwrite:
+        raise OSError("File {0} already exists. If you mean to replace it "
+                      "then use the argument overwrite=True.".format(filename))
+
+    if isinstance(time_series, BinnedTimeSeries):
+        time = time_series.time_bin_start
+    else:
+        time = time_series.time
+
+    # Time.argsort sorts by the two parts of the Julian Dates, so it is only
+    # used if the times are not already sorted.
+    if len(time) > 1 and not np.all(time[1:] >= time[:-1]):
+        time_series = time_series[time.argsort()]
+
+    table = time_series.to_arrow(time_encoding='offset')
+
+    # Dictionary encoding is only useful for columns with repeated values, and
+    # makes writing numerical columns several times slower.
+    use_dictionary = [field.name for field in table.schema
+                      if pa.types.is_string(field.type) or pa.types.is_binary(field.type)]
+
+    pq.write_table(table, filename, row_group_size=row_group_size,
+                   compression=compression, use_dictionary=use_dictionary)
+
+
+def parquet_reader(filename, columns=None, time_range=None):
+    """
+    Read a time series written to a Parquet file.
+
+    Parameters
+    ----------
+    filename : str
+        The Parquet file to read.
+    columns : list of str, optional
+        If specified, only these columns are read. The time columns are always
+        included.
+    time_range : tuple, optional
+        If specified, only the samples with times in this ``(start, stop)``
+        range are returned, including the start time and excluding the stop
+        time (or for binned time series, the bins which overlap the time
+        range). Either time can be `None` for an open-ended range. Row groups
+        which do not overlap the time range are not read.
+
+    Returns
+    -------
+    `~astropy_timeseries.TimeSeries` or `~astropy_timeseries.BinnedTimeSeries`
+        The time series, of the same class as the one written.
+    """
+
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(filename)
+    schema = parquet_file.schema_arrow
+
+    schema_metadata = schema.metadata or {}
+    if SCHEMA_KEY in schema_metadata:
+        class_name = json.loads(schema_metadata[SCHEMA_KEY].decode('utf-8'))['class']
+    else:
+        class_name = None
+
+    if class_name == 'BinnedTimeSeries':
+        cls = BinnedTimeSeries
+        required = ['time_bin_start', 'time_bin_size']
+    else:
+        cls = TimeSeries
+        required = ['time']
+
+    if columns is None:
+        names = schema.names
+    else:
+        names = list(required)
+        for name in columns:
+            if name not in schema.names:
+                raise ValueError("Column '{}' not found in the input data.".format(name))
+            if name not in names:
+                names.append(name)
+
+    if time_range is None:
+        row_groups = list(range(parquet_file.metadata.num_row_groups))
+    else:
+        row_groups = _row_groups(parquet_file, required[0],
+                                 required[1] if cls is BinnedTimeSeries else None,
+                                 time_range)
+
+    time_series = cls.from_arrow(parquet_file.read_row_groups(row_groups, columns=names))
+
+    # The row groups can contain rows outside the time range, which are
+    # removed here.
+    if time_range is not None:
+        if cls is BinnedTimeSeries:
+            keep = _time_range_mask(time_range, time_series.time_bin_start,
+                                    time_series.time_bin_end)
+        else:
+            keep = _time_range_mask(time_range, time_series.time)
+        if not np.all(keep):
+            time_series = time_series[keep]
+
+    return time_series
+
+
+registry.register_reader('parquet', TimeSeries, parquet_reader)
+registry.register_reader('parquet', BinnedTimeSeries, parquet_reader)
+registry.register_writer('parquet', TimeSeries, parquet_writer)
+registry.register_writer('parquet', BinnedTimeSeries, parquet_writer)
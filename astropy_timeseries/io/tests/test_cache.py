@@ -0,0 +1,95 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import os
+
+import pytest
+
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.time import Time
+
+from ...sampled import TimeSeries
+from ...binned import BinnedTimeSeries
+from ..cache import ReadCache
+
+
+def write_csv(filename, values):
+    with open(filename, 'w') as f:
+        f.write('date,flux\n')
+        for day, value in enumerate(values):
+            f.write('2016-03-{0:02d},{1}\n'.format(day + 1, value))
+
+
+def test_read_cache(tmpdir):
+
+    filename = str(tmpdir.join('ts.csv'))
+    write_csv(filename, [1, 2, 3])
+
+    cache = ReadCache(str(tmpdir.join('cache')))
+
+    ts1 = TimeSeries.read(filename, time_column='date', format='csv', read_cache=cache)
+    assert len(os.listdir(cache.directory)) == 1
+
+    ts2 = TimeSeries.read(filename, time_column='date', format='csv', read_cache=cache)
+    assert isinstance(ts2, TimeSeries)
+    assert_equal(ts2['flux'], [1, 2, 3])
+    assert_equal(ts2.time.jd, ts1.time.jd)
+    # Time series read from the cache are memory-mapped
+    assert not ts2['flux'].data.flags.writeable
+
+    # Different options should give a different entry
+    ts3 = TimeSeries.read(filename, time_column='date', format='csv', read_cache=cache,
+                          time_range=(Time('2016-03-02'), None))
+    assert_equal(ts3['flux'], [2, 3])
+    assert len(os.listdir(cache.directory)) == 2
+
+    # Reading the file as a different class should also give a different entry
+    assert (cache.key(TimeSeries, filename, format='csv') !=
+            cache.key(BinnedTimeSeries, filename, format='csv'))
+
+    # Modifying the file should invalidate the entry
+    write_csv(filename, [4, 5, 6, 7])
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    ts4 = TimeSeries.read(filename, time_column='date', format='csv', read_cache=cache)
+    assert_equal(ts4['flux'], [4, 5, 6, 7])
+
+    cache.clear()
+    assert cache.size() == 0 * u.byte
+
+
+def test_read_cache_eviction(tmpdir):
+
+    filenames = []
+    for index in range(3):
+        filename = str(tmpdir.join('ts{0}.csv'.format(index)))
+        write_csv(filename, [1, 2, 3])
+        filenames.append(filename)
+
+    cache = ReadCache(str(tmpdir.join('cache')))
+
+    TimeSeries.read(filenames[0], time_column='date', format='csv', read_cache=cache)
+    entry_size = cache.size()
+
+    # Keep room for two entries only
+    cache.max_size = 2.5 * entry_size
+
+    key0 = cache.key(TimeSeries, filenames[0], time_column='date', time_format=None, time_scale=None,
+                     format='csv', time_range=None, args=())
+    TimeSeries.read(filenames[1], time_column='date', format='csv', read_cache=cache)
+
+    # Access the first entry so that the second is the least recently used
+    header = os.path.join(cache.directory, key0, 'header.json')
+    os.utime(header, (0, os.path.getmtime(header) + 10))
+    TimeSeries.read(filenames[2], time_column='date', format='csv', read_cache=cache)
+
+    assert len(os.listdir(cache.directory)) == 2
+    assert cache.get(key0) is not None
+    assert cache.size() <= cache.max_size
+
+
+def test_read_cache_invalid(tmpdir):
+    with pytest.raises(TypeError) as exc:
+        ReadCache(str(tmpdir), max_size=1000)
+    assert exc.value.args[0] == "max_size should be a Quantity"
@@ -0,0 +1,66 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import os
+from unittest import mock
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from astropy.time import Time
+
+from ..catalog import LightCurveCatalog
+from .test_kepler import fake_light_curve
+
+
+def test_catalog(tmpdir):
+
+    # Light curves for days 100 to 101.5 and 200 to 201.5 after the reference
+    # time, which is JD 2454833.5
+    kepler = fake_light_curve(str(tmpdir.join('kepler.fits')))
+    tess = fake_light_curve(str(tmpdir.join('tess.fits')), telescop='TESS',
+                            time=(np.nan, 200., 200.5, 201., 201.5))
+    invalid = str(tmpdir.join('invalid.fits'))
+    with open(invalid, 'w') as f:
+        f.write('not a FITS file')
+
+    filename = str(tmpdir.join('catalog.db'))
+
+    with LightCurveCatalog(filename) as catalog:
+        errors = catalog.scan([tess, kepler, invalid])
+        assert list(errors) == [invalid]
+        assert len(catalog) == 2
+
+        row = catalog._connection.execute("SELECT telescope, object, time_first, time_last, "
+                                          "n_rows FROM files WHERE path = ?", (tess,)).fetchone()
+        assert row[:2] == ('tess', 'KIC 1234')
+        assert_allclose(row[2:4], [2455033.5, 2455035])
+        assert row[4] == 5
+
+        assert catalog.query() == [kepler, tess]
+        assert catalog.query(telescope='TESS') == [tess]
+        assert catalog.query(target='kic 1234') == [kepler, tess]
+        assert catalog.query(target='KIC 5678') == []
+
+        # The start time is included and the stop time excluded
+        start = Time(2454935.0, format='jd', scale='tdb')
+        assert catalog.query(time_range=(start, None)) == [kepler, tess]
+        assert catalog.query(time_range=(start + 1e-3, None)) == [tess]
+        assert catalog.query(time_range=(None, Time(2455033.5, format='jd', scale='tdb'))) == [kepler]
+        assert catalog.query(time_range=('2009-01-01', '2010-01-01')) == [kepler, tess]
+
+    # Unchanged files are not scanned again
+    with LightCurveCatalog(filename) as catalog:
+        with mock.patch('astropy_timeseries.io.catalog._scan_file') as scan_file:
+            errors = catalog.scan([kepler, os.path.join(str(tmpdir), 'missing.fits')])
+        assert not scan_file.called
+        assert list(errors) == [os.path.join(str(tmpdir), 'missing.fits')]
+        assert len(catalog) == 2
+
+
+def test_catalog_workers(tmpdir):
+    filenames = [fake_light_curve(str(tmpdir.join('lc{0}.fits'.format(index))),
+                                  time=np.arange(5) + 100. * index)
+                 for index in range(4)]
+    with LightCurveCatalog(':memory:') as catalog:
+        assert catalog.scan(filenames, workers=2) == {}
+        assert catalog.query(time_range=('2009-04-10', '2009-07-22')) == filenames[1:3]
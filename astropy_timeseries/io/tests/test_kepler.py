@@ -3,10 +3,18 @@ from unittest import mock
 
 import pytest
 
-from astropy.io.fits import HDUList, Header, PrimaryHDU, BinTableHDU
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+
+from astropy import units as u
+from astropy.io import fits
+from astropy.io.fits import HDUList, Header, PrimaryHDU, BinTableHDU, Column
+from astropy.table import MaskedColumn
+from astropy.time import Time
 from astropy.utils.data import get_pkg_data_filename
 
-from ..kepler import kepler_fits_reader
+from ...sampled import TimeSeries
+from ..kepler import kepler_fits_reader, kepler_tpf_reader, _nan_bisect_left, QUALITY_DEFAULT
 
 
 def fake_header(extver, version, timesys, telescop):
@@ -25,6 +33,245 @@ def fake_hdulist(extver=1, version=2, timesys="TDB", telescop="KEPLER"):
                     BinTableHDU(header=new_header, name="LIGHTCURVE")])]
 
 
+def fake_light_curve(filename, telescop="KEPLER", time=(100., 100.5, np.nan, 101., 101.5)):
+    header = fake_header(1, 2, "TDB", telescop)
+    header['BJDREFI'] = 2454833
+    header['BJDREFF'] = 0.5
+    header['OBJECT'] = 'KIC 1234'
+    columns = [Column(name='TIME', format='D', unit='BJD - 2454833',
+                      array=time),
+               Column(name='SAP_FLUX', format='E', unit='e-/s',
+                      array=[10., 11., 12., 13., 14.]),
+               Column(name='MOM_CENTR1', format='D', unit='pixels',
+                      array=[1., 2., 3., 4., 5.]),
+               Column(name='SAP_QUALITY', format='J', null=65536,
+                      array=[0, 16, 0, 65536, 128])]
+    hdu = BinTableHDU.from_columns(columns, header=header, name="LIGHTCURVE")
+    HDUList([PrimaryHDU(header=fake_header(1, 2, "TDB", telescop)), hdu]).writeto(filename)
+    return filename
+
+
+def fake_target_pixel_file(filename, telescop="TESS", time=(100., np.nan, 101., 101.5, np.nan)):
+    header = fake_header(1, 2, "TDB", telescop)
+    header['BJDREFI'] = 2457000
+    header['BJDREFF'] = 0.
+    flux = np.arange(60, dtype=float).reshape(5, 3, 4)
+    columns = [Column(name='TIME', format='D', unit='BJD - 2457000', array=time),
+               Column(name='CADENCENO', format='J', array=[1, 2, 3, 4, 5]),
+               Column(name='FLUX', format='12E', dim='(4,3)', unit='e-/s', array=flux),
+               Column(name='QUALITY', format='J', array=[0, 0, 16, 0, 0])]
+    hdu = BinTableHDU.from_columns(columns, header=header, name="PIXELS")
+    HDUList([PrimaryHDU(header=fake_header(1, 2, "TDB", telescop)), hdu]).writeto(filename)
+    return filename
+
+
+@pytest.mark.parametrize('telescop', ['KEPLER', 'TESS'])
+def test_read_light_curve(tmpdir, telescop):
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')), telescop=telescop)
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename)
+    assert timeseries.colnames == ['time', 'sap_flux', 'mom_centr1', 'sap_quality']
+    assert timeseries["time"].scale == 'tdb'
+    assert_allclose(timeseries["time"].jd, [2454933.5, 2454934, 2454934.5, 2454935])
+    assert timeseries["sap_flux"].unit == u.electron / u.s
+    assert timeseries["mom_centr1"].unit == u.pixel
+    assert_equal(timeseries["sap_flux"].value, [10, 11, 13, 14])
+    assert timeseries["sap_flux"].dtype.isnative
+    assert_equal(timeseries["sap_quality"].mask, [False, False, True, False])
+    assert timeseries.meta['OBJECT'] == 'KIC 1234'
+    assert 'TTYPE1' not in timeseries.meta
+
+
+def test_read_light_curve_nan_edges(tmpdir):
+    # Rows with NaN times at the start and end of the data
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')),
+                                time=[np.nan, 100.5, 101., 101.5, np.nan])
+    with pytest.warns(UserWarning, match='Ignoring 2 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename)
+    assert_allclose(timeseries["time"].jd, [2454934, 2454934.5, 2454935])
+    assert_equal(timeseries["sap_flux"].value, [11, 12, 13])
+    assert_equal(timeseries["sap_quality"].mask, [False, False, True])
+
+
+def test_read_light_curve_columns(tmpdir):
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')))
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, columns=['sap_flux', 'SAP_FLUX'])
+    assert timeseries.colnames == ['time', 'sap_flux']
+    assert_equal(timeseries["sap_flux"].value, [10, 11, 13, 14])
+
+    with pytest.raises(ValueError) as exc:
+        kepler_fits_reader(filename, columns=['pdcsap_flux'])
+    assert exc.value.args[0] == "Column 'pdcsap_flux' not found in the input data."
+
+
+def test_read_light_curve_time_range(tmpdir):
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')))
+
+    start = Time(2454934, format='jd', scale='tdb')
+    stop = Time(2454935, format='jd', scale='tdb')
+
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, time_range=(start, stop))
+    assert_allclose(timeseries["time"].jd, [2454934, 2454934.5])
+    assert_equal(timeseries["sap_flux"].value, [11, 13])
+
+    timeseries = kepler_fits_reader(filename, time_range=(stop, None))
+    assert_allclose(timeseries["time"].jd, [2454935])
+
+    # The time range is converted to the time scale of the file
+    timeseries = kepler_fits_reader(filename, time_range=(None, start.utc))
+    assert_allclose(timeseries["time"].jd, [2454933.5])
+
+    timeseries = kepler_fits_reader(filename, time_range=(stop, start))
+    assert len(timeseries) == 0
+
+
+def test_read_light_curve_quality_bitmask(tmpdir):
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')))
+
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, quality_bitmask=QUALITY_DEFAULT)
+    assert_equal(timeseries["sap_flux"].value, [10, 11, 13])
+
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, quality_bitmask='hard')
+    assert_equal(timeseries["sap_flux"].value, [10, 13])
+
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, quality_bitmask='hardest')
+    assert_equal(timeseries["sap_flux"].value, [10])
+
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename, quality_bitmask='none')
+    assert_equal(timeseries["sap_flux"].value, [10, 11, 13, 14])
+
+    with pytest.raises(ValueError) as exc:
+        kepler_fits_reader(filename, quality_bitmask='soft')
+    assert exc.value.args[0] == ("quality_bitmask should be an integer or one of "
+                                 "'none', 'default', 'hard' or 'hardest'")
+
+    # TESS files have a QUALITY column instead
+    filename = fake_light_curve(str(tmpdir.join('lc_tess.fits')), telescop='TESS')
+    with pytest.raises(ValueError) as exc:
+        kepler_fits_reader(filename, quality_bitmask='default')
+    assert exc.value.args[0] == "Quality column 'QUALITY' not found in the input data."
+
+
+@pytest.mark.parametrize('telescop', ['KEPLER', 'TESS'])
+def test_write_light_curve(tmpdir, telescop):
+    filename = fake_light_curve(str(tmpdir.join('lc.fits')), telescop=telescop)
+    with pytest.warns(UserWarning, match='Ignoring 1 rows with NaN times'):
+        timeseries = kepler_fits_reader(filename)
+
+    fmt = telescop.lower() + '.fits'
+    timeseries.write(str(tmpdir.join('lc_out.fits')), format=fmt)
+
+    timeseries2 = TimeSeries.read(str(tmpdir.join('lc_out.fits')), format=fmt)
+    assert timeseries2.colnames == timeseries.colnames
+    assert_equal(timeseries2.time.jd1, timeseries.time.jd1)
+    assert_equal(timeseries2.time.jd2, timeseries.time.jd2)
+    assert timeseries2["sap_flux"].unit == u.electron / u.s
+    assert timeseries2["mom_centr1"].unit == u.pixel
+    assert_equal(timeseries2["sap_flux"].value, [10, 11, 13, 14])
+    assert_equal(timeseries2["sap_quality"].mask, [False, False, True, False])
+    assert timeseries2.meta['OBJECT'] == 'KIC 1234'
+    assert timeseries2.meta['BJDREFI'] == 2454833
+    assert timeseries2.meta['BJDREFF'] == 0.5
+
+    # The times are written relative to the reference time
+    with fits.open(str(tmpdir.join('lc_out.fits'))) as hdulist:
+        assert_equal(hdulist[1].data['TIME'], [100., 100.5, 101., 101.5])
+
+
+def test_write_light_curve_reference(tmpdir):
+
+    # The mission reference time is used if it is not in the metadata
+    timeseries = TimeSeries(time=Time([2458400.25, 2458400.75], format='jd', scale='tdb'),
+                            data={'flux': [1., 2.] * u.mJy, 'flag': [True, False]})
+    timeseries.write(str(tmpdir.join('lc.fits')), format='tess.fits')
+
+    with fits.open(str(tmpdir.join('lc.fits'))) as hdulist:
+        assert hdulist[1].header['BJDREFI'] == 2457000
+        assert_equal(hdulist[1].data['TIME'], [1400.25, 1400.75])
+
+    timeseries2 = TimeSeries.read(str(tmpdir.join('lc.fits')), format='tess.fits')
+    assert_equal(timeseries2.time.jd, [2458400.25, 2458400.75])
+    assert timeseries2['flux'].unit == u.mJy
+    assert_equal(timeseries2['flag'], [True, False])
+
+    timeseries['ref'] = timeseries.time
+    with pytest.raises(TypeError) as exc:
+        timeseries.write(str(tmpdir.join('lc2.fits')), format='kepler.fits')
+    assert exc.value.args[0] == ("Column 'ref' of type Time cannot be written in the Kepler or "
+                                 "TESS format")
+
+
+def test_write_light_curve_masked_integers(tmpdir):
+
+    # The null values of masked integer columns fit in their dtype, and do not
+    # occur in their unmasked values
+    timeseries = TimeSeries(time=Time([2458400.25, 2458400.75, 2458401.25], format='jd',
+                                      scale='tdb'))
+    timeseries['short'] = MaskedColumn(np.array([1, 2, 3], dtype=np.int16),
+                                       mask=[False, True, False])
+    timeseries['long'] = MaskedColumn(np.array([1, 999999, 3], dtype=np.int32),
+                                      mask=[False, False, True])
+    timeseries.write(str(tmpdir.join('lc.fits')), format='tess.fits')
+
+    timeseries2 = TimeSeries.read(str(tmpdir.join('lc.fits')), format='tess.fits')
+    assert timeseries2['short'].dtype == np.int16
+    assert_equal(timeseries2['short'].mask, [False, True, False])
+    assert_equal(timeseries2['short'][[0, 2]], [1, 3])
+    assert timeseries2['long'].dtype == np.int32
+    assert_equal(timeseries2['long'].mask, [False, False, True])
+    assert_equal(timeseries2['long'][:2], [1, 999999])
+
+    timeseries = TimeSeries(time=Time(2458400.25 + np.arange(257), format='jd', scale='tdb'))
+    timeseries['byte'] = MaskedColumn(np.arange(-128, 129).astype(np.int8),
+                                      mask=[True] + [False] * 256)
+    with pytest.raises(ValueError) as exc:
+        timeseries.write(str(tmpdir.join('lc2.fits')), format='tess.fits')
+    assert exc.value.args[0] == ("Masked column uses all the values of its dtype (int8), so no "
+                                 "null value can be written")
+
+
+@pytest.mark.parametrize('telescop', ['KEPLER', 'TESS'])
+def test_read_target_pixel_file(tmpdir, telescop):
+    filename = fake_target_pixel_file(str(tmpdir.join('tpf.fits')), telescop=telescop)
+
+    with pytest.warns(UserWarning) as warning_lines:
+        timeseries = TimeSeries.read(filename, format=telescop.lower() + '.tpf')
+    assert [str(w.message) for w in warning_lines] == ['Ignoring 1 rows with NaN times',
+                                                       'Masking 1 rows with NaN times']
+
+    assert timeseries.colnames == ['time', 'cadenceno', 'flux', 'quality']
+    assert timeseries.time.scale == 'tdb'
+    assert_equal(timeseries.time.mask, [False, True, False, False])
+    assert_allclose(timeseries.time.jd[[0, 2, 3]], [2457100, 2457101, 2457101.5])
+    assert_equal(timeseries['cadenceno'], [1, 2, 3, 4])
+
+    # The images are memory-mapped rather than copied
+    assert timeseries['flux'].shape == (4, 3, 4)
+    assert timeseries['flux'].unit == u.electron / u.s
+    assert not timeseries['flux'].flags.owndata
+    assert_equal(timeseries['flux'][1:3].value, np.arange(12, 36).reshape(2, 3, 4))
+
+    timeseries = kepler_tpf_reader(filename, columns=['flux'],
+                                   time_range=(Time(2457101, format='jd', scale='tdb'), None))
+    assert timeseries.colnames == ['time', 'flux']
+    assert_equal(timeseries['flux'].value, np.arange(24, 48).reshape(2, 3, 4))
+
+
+def test_nan_bisect_left():
+    values = np.array([np.nan, 1., 2., np.nan, np.nan, 3., 5., np.nan])
+    for value in [0., 1., 1.5, 2., 2.5, 3., 4., 5., 6.]:
+        index = _nan_bisect_left(values, value)
+        assert np.all(values[:index][~np.isnan(values[:index])] < value)
+        assert np.all(values[index:][~np.isnan(values[index:])] >= value)
+    assert _nan_bisect_left(np.array([np.nan, np.nan]), 1.) == 0
+
+
 @mock.patch("astropy.io.fits.open", side_effect=fake_hdulist(telescop="MadeUp"))
 def test_raise_telescop_wrong(mock_file):
     with pytest.raises(NotImplementedError) as exc:
@@ -0,0 +1,125 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import os
+
+import pytest
+
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.table import MaskedColumn
+from astropy.time import Time
+
+from ...sampled import TimeSeries
+from ...binned import BinnedTimeSeries
+from ..native import native_reader
+
+
+def test_roundtrip_sampled(tmpdir):
+
+    dirname = str(tmpdir.join('ts'))
+
+    ts = TimeSeries(time=Time(['2016-03-22T12:30:31.123456789', '2016-03-22T12:30:34'],
+                              scale='tdb'),
+                    data={'flux': [1., 4.] * u.mJy, 'id': [3, 4],
+                          'flag': MaskedColumn([1, 2], mask=[False, True]),
+                          'name': ['a', 'b']})
+    ts.meta['target'] = 'x'
+    ts['flux'].info.description = 'Flux'
+
+    ts.write(dirname, format='native')
+
+    ts2 = TimeSeries.read(dirname, format='native')
+    assert isinstance(ts2, TimeSeries)
+    assert ts2.colnames == ts.colnames
+    assert ts2.time.scale == 'tdb'
+    assert ts2.time.format == 'isot'
+    assert_equal(ts2.time.jd1, ts.time.jd1)
+    assert_equal(ts2.time.jd2, ts.time.jd2)
+    assert ts2['flux'].unit is u.mJy
+    assert ts2['flux'].info.description == 'Flux'
+    assert_equal(ts2['flux'].value, [1, 4])
+    assert_equal(ts2['id'], [3, 4])
+    assert_equal(ts2['flag'].mask, [False, True])
+    assert_equal(ts2['name'], ['a', 'b'])
+    assert ts2.meta == {'target': 'x'}
+
+    # The columns are memory-mapped (read-only) by default
+    assert not ts2['id'].data.flags.writeable
+    assert not ts2['flux'].flags.writeable
+    ts3 = native_reader(dirname, memmap=False)
+    assert ts3['id'].data.flags.writeable
+    assert_equal(ts3['id'], [3, 4])
+
+
+def test_roundtrip_binned(tmpdir):
+
+    dirname = str(tmpdir.join('binned'))
+
+    ts = BinnedTimeSeries(time_bin_start='2016-03-22T12:30:31', time_bin_size=3 * u.s,
+                          data={'flux': [1., 4., 5.] * u.mJy})
+    ts.write(dirname, format='native')
+
+    ts2 = BinnedTimeSeries.read(dirname, format='native')
+    assert isinstance(ts2, BinnedTimeSeries)
+    assert ts2.colnames == ['time_bin_start', 'time_bin_size', 'flux']
+    assert_equal(ts2.time_bin_start.isot, ts.time_bin_start.isot)
+    assert_equal(ts2.time_bin_size.to_value(u.s), [3, 3, 3])
+
+
+def test_write_invalid(tmpdir):
+
+    dirname = str(tmpdir.join('ts'))
+
+    ts = TimeSeries(time=Time(['2016-03-22T12:30:31', '2016-03-22T12:30:34']),
+                    data={'flux': [1., 4.]})
+    ts.write(dirname, format='native')
+
+    with pytest.raises(OSError) as exc:
+        ts.write(dirname, format='native')
+    assert exc.value.args[0] == ("Directory {0} already exists. If you mean to replace it "
+                                 "then use the argument overwrite=True.".format(dirname))
+
+    ts['flux'] = [2., 3.]
+    ts.write(dirname, format='native', overwrite=True)
+    assert_equal(TimeSeries.read(dirname, format='native')['flux'], [2, 3])
+
+    ts.meta['bad'] = object()
+    with pytest.raises(TypeError) as exc:
+        ts.write(str(tmpdir.join('bad')), format='native')
+    assert exc.value.args[0] == ("The metadata should be JSON-serializable to be written in "
+                                 "the native format")
+
+
+def test_overwrite_fewer_columns(tmpdir):
+
+    dirname = str(tmpdir.join('ts'))
+
+    ts = TimeSeries(time=Time(['2016-03-22T12:30:31', '2016-03-22T12:30:34']),
+                    data={'flux': [1., 4.], 'id': [3, 4], 'flag': [0, 1]})
+    ts.write(dirname, format='native')
+    ts2 = TimeSeries.read(dirname, format='native')
+
+    ts['flux'] = [2., 3.]
+    ts.remove_columns(['id', 'flag'])
+    ts.write(dirname, format='native', overwrite=True)
+
+    ts3 = TimeSeries.read(dirname, format='native')
+    assert ts3.colnames == ['time', 'flux']
+    assert_equal(ts3['flux'], [2, 3])
+
+    # The files of the previous time series are removed, as well as the
+    # temporary directories, but the columns memory-mapped from them can
+    # still be accessed.
+    assert sorted(os.listdir(dirname)) == ['column_0_jd1.npy', 'column_0_jd2.npy',
+                                           'column_1.npy', 'header.json']
+    assert os.listdir(str(tmpdir)) == ['ts']
+    assert_equal(ts2['flux'], [1, 4])
+    assert_equal(ts2['id'], [3, 4])
+
+    # A failed write leaves the directory unchanged
+    ts.meta['bad'] = object()
+    with pytest.raises(TypeError):
+        ts.write(dirname, format='native', overwrite=True)
+    assert_equal(TimeSeries.read(dirname, format='native')['flux'], [2, 3])
+    assert os.listdir(str(tmpdir)) == ['ts']
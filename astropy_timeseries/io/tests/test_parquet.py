@@ -0,0 +1,114 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+from unittest import mock
+
+import pytest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.time import Time
+
+from ...sampled import TimeSeries
+from ...binned import BinnedTimeSeries
+from .. import parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def make_time_series(n_rows):
+    time = Time('2016-03-22T12:30:31') + np.arange(n_rows) * u.min
+    ts = TimeSeries(time=time, data=[np.arange(n_rows) * u.mJy, np.arange(n_rows) % 7],
+                    names=['flux', 'quality'])
+    ts.meta['object'] = 'KIC 10666592'
+    return ts
+
+
+def test_parquet_roundtrip(tmpdir):
+
+    filename = str(tmpdir.join('ts.parquet'))
+
+    ts = make_time_series(100)
+    ts.write(filename, format='parquet')
+
+    ts2 = TimeSeries.read(filename, format='parquet')
+    assert isinstance(ts2, TimeSeries)
+    assert ts2.colnames == ['time', 'flux', 'quality']
+    assert ts2.meta == ts.meta
+    assert np.all(np.abs((ts2.time - ts.time).to_value(u.ns)) < 1)
+    assert ts2['flux'].unit is u.mJy
+    assert_equal(ts2['flux'].value, ts['flux'].value)
+    assert_equal(ts2['quality'], ts['quality'])
+
+    with pytest.raises(OSError) as exc:
+        ts.write(filename, format='parquet')
+    assert exc.value.args[0].startswith("File {0} already exists".format(filename))
+
+
+def test_parquet_sorted(tmpdir):
+
+    filename = str(tmpdir.join('ts.parquet'))
+
+    ts = make_time_series(10)
+    ts[::-1].write(filename, format='parquet')
+
+    ts2 = TimeSeries.read(filename, format='parquet')
+    assert np.all(ts2.time[1:] > ts2.time[:-1])
+    assert_equal(ts2['flux'].value, ts['flux'].value)
+
+
+def test_parquet_time_range(tmpdir):
+
+    filename = str(tmpdir.join('ts.parquet'))
+
+    ts = make_time_series(100)
+    ts.write(filename, format='parquet', row_group_size=10)
+    assert pq.ParquetFile(filename).metadata.num_row_groups == 10
+
+    read_row_groups = pq.ParquetFile.read_row_groups
+
+    with mock.patch.object(pq.ParquetFile, 'read_row_groups', autospec=True,
+                           side_effect=read_row_groups) as mock_read:
+        ts2 = TimeSeries.read(filename, format='parquet', columns=['flux'],
+                              time_range=(ts.time[25], ts.time[42]))
+
+    # Only the row groups overlapping the time range should be read, and only
+    # the requested columns
+    assert mock_read.call_args[0][1] == [2, 3, 4]
+    assert ts2.colnames == ['time', 'flux']
+    assert_equal(ts2['flux'].value, np.arange(25, 42))
+
+    ts3 = TimeSeries.read(filename, format='parquet', time_range=(ts.time[95], None))
+    assert_equal(ts3['quality'], ts['quality'][95:])
+
+
+def test_parquet_binned(tmpdir):
+
+    filename = str(tmpdir.join('binned.parquet'))
+
+    ts = BinnedTimeSeries(time_bin_start='2016-03-22T12:30:31',
+                          time_bin_size=[3, 10, 3, 3, 3, 3] * u.s,
+                          data=[[1, 2, 3, 4, 5, 6]], names=['counts'])
+    ts.write(filename, format='parquet', row_group_size=2)
+
+    ts2 = BinnedTimeSeries.read(filename, format='parquet')
+    assert isinstance(ts2, BinnedTimeSeries)
+    assert_equal(ts2.time_bin_size.to_value(u.s), [3, 10, 3, 3, 3, 3])
+    assert_equal(ts2['counts'], [1, 2, 3, 4, 5, 6])
+
+    # The long second bin, in the first row group, overlaps the time range
+    # although it starts before it
+    ts3 = BinnedTimeSeries.read(filename, format='parquet',
+                                time_range=('2016-03-22T12:30:40', '2016-03-22T12:30:46'))
+    assert_equal(ts3['counts'], [2, 3])
+
+
+def test_parquet_missing_column(tmpdir):
+
+    filename = str(tmpdir.join('ts.parquet'))
+    make_time_series(10).write(filename, format='parquet')
+
+    with pytest.raises(ValueError) as exc:
+        parquet.parquet_reader(filename, columns=['sap_flux'])
+    assert exc.value.args[0] == "Column 'sap_flux' not found in the input data."
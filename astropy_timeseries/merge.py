@@ -0,0 +1,132 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+from collections import OrderedDict
+
+import numpy as np
+
+from astropy.utils.metadata import merge
+
+from .sampled import TimeSeries
+
+__all__ = ['sorted_vstack']
+
+
+def _get_out_class(cols):
+    """
+    Return the most derived class of the input columns, which is the class
+    used for the output column (as done by `~astropy.table.vstack`).
+    """
+    out_class = cols[0].__class__
+    for col in cols[1:]:
+        if issubclass(col.__class__, out_class):
+            out_class = col.__class__
+    return out_class
+
+
+def sorted_vstack(time_series, drop_duplicates=False, metadata_conflicts='warn'):
+    """
+    Stack time series vertically, returning a single time series sorted by
+    time.
+
+    Unlike `~astropy.table.vstack`, the rows of the inputs are merged by time
+    rather than simply concatenated, so that the result is sorted even if the
+    time ranges of the inputs interleave. When the inputs are each already
+    sorted (as is the case for e.g. individual Kepler quarters or TESS
+    sectors), the merge is done in a single k-way pass over the times, and
+    each output column is allocated and filled exactly once. The index on
+    the ``time`` column is then built once for the final time series.
+
+    Parameters
+    ----------
+    time_series : iterable of :class:`~astropy_timeseries.TimeSeries`
+        The time series to stack. All time series should have the same
+        column names.
+    drop_duplicates : bool, optional
+        If `True`, only the first row (in the order in which the time series
+        are given) is kept for each set of rows with identical times.
+    metadata_conflicts : str, optional
+        How to proceed with metadata conflicts. This should be one of
+        ``'silent'``, ``'warn'``, or ``'error'`` (see
+        `~astropy.table.vstack`).
+
+    Returns
+    -------
+    stacked : :class:`~astropy_timeseries.TimeSeries`
+        The stacked time series, sorted by time.
+    """
+
+    if isinstance(time_series, TimeSeries):
+        time_series = [time_series]
+    else:
+        time_series = list(time_series)
+
+    if len(time_series) == 0:
+        raise ValueError("time_series should contain at least one TimeSeries")
+
+    for ts in time_series:
+        if not isinstance(ts, TimeSeries):
+            raise TypeError("time_series should be a list of TimeSeries")
+
+    colnames = time_series[0].colnames
+    for ts in time_series[1:]:
+        if set(ts.colnames) != set(colnames):
+            raise ValueError("All time series should have the same column names")
+
+    # Extract the times of all inputs in a common time scale
+    scale = time_series[0].time.scale
+    times = [ts.time if ts.time.scale == scale else getattr(ts.time, scale)
+             for ts in time_series]
+    jd1 = np.concatenate([time.jd1 for time in times])
+    jd2 = np.concatenate([time.jd2 for time in times])
+
+    # Determine the order of all rows in the merged time series. The stable
+    # sort is a timsort, which detects the sorted runs given by the inputs
+    # and merges them, so for sorted inputs this is a k-way merge.
+    relative_time = (jd1 - jd1[0]) + (jd2 - jd2[0])
+    order = np.argsort(relative_time, kind='stable')
+
+    if drop_duplicates and len(order) > 1:
+        jd1_sorted = jd1[order]
+        jd2_sorted = jd2[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (jd1_sorted[1:] != jd1_sorted[:-1]) | (jd2_sorted[1:] != jd2_sorted[:-1])
+        order = order[keep]
+
+    n_rows = len(order)
+
+    # For each row of the concatenated inputs, find the position in the
+    # output, or -1 if the row has been dropped.
+    position = np.repeat(-1, len(relative_time))
+    position[order] = np.arange(n_rows)
+
+    names = [name for name in colnames if name != 'time']
+    columns = []
+
+    for name in ['time'] + names:
+
+        if name == 'time':
+            cols = times
+        else:
+            cols = [ts[name] for ts in time_series]
+
+        col = _get_out_class(cols).info.new_like(cols, n_rows, metadata_conflicts, name)
+
+        start = 0
+        for input_col in cols:
+            end = start + len(input_col)
+            indices = position[start:end]
+            keep = indices >= 0
+            if np.all(keep):
+                col[indices] = input_col
+            elif np.any(keep):
+                col[indices[keep]] = input_col[keep]
+            start = end
+
+        columns.append(col)
+
+    meta = OrderedDict()
+    for ts in time_series:
+        meta = merge(meta, ts.meta, metadata_conflicts=metadata_conflicts)
+
+    return time_series[0].__class__(time=columns[0], data=columns[1:], names=names,
+                                    meta=meta, copy=False)
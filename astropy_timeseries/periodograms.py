@@ -0,0 +1,285 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .downsample import phase_bin_indices
+
+__all__ = ['lombscargle', 'box_least_squares']
+
+
+def _lombscargle_chunk(t, y, w, frequency):
+    """
+    Compute the Lomb-Scargle power for a chunk of frequencies.
+
+    This uses the floating-mean (generalized) form of the periodogram. ``y``
+    should already be centered and ``w`` should be normalized so that it
+    sums to one.
+    """
+
+    omega_t = np.multiply.outer(2 * np.pi * frequency, t)
+
+    cos_omega_t = np.cos(omega_t)
+    sin_omega_t = np.sin(omega_t, out=omega_t)
+
+    C = cos_omega_t.dot(w)
+    S = sin_omega_t.dot(w)
+    YC = cos_omega_t.dot(w * y)
+    YS = sin_omega_t.dot(w * y)
+
+    # Use the double-angle formulae to find the weighted sums of cos^2, sin^2
+    # and cos * sin, without computing further trigonometric functions
+    CS = (cos_omega_t * sin_omega_t).dot(w)
+    cos_omega_t *= cos_omega_t
+    CC = cos_omega_t.dot(w)
+    SS = 1 - CC
+
+    CC -= C * C
+    SS -= S * S
+    CS -= C * S
+
+    tau = 0.5 * np.arctan2(2 * CS, CC - SS)
+    C_tau = np.cos(tau)
+    S_tau = np.sin(tau)
+
+    YC_tau = C_tau * YC + S_tau * YS
+    YS_tau = C_tau * YS - S_tau * YC
+    CC_tau = C_tau * C_tau * CC + 2 * C_tau * S_tau * CS + S_tau * S_tau * SS
+    SS_tau = S_tau * S_tau * CC - 2 * C_tau * S_tau * CS + C_tau * C_tau * SS
+
+    return YC_tau * YC_tau / CC_tau + YS_tau * YS_tau / SS_tau
+
+
+def _lombscargle_chunks(t, y, w, frequency, chunk_size):
+    """
+    Compute the Lomb-Scargle power for the frequencies in chunks of
+    ``chunk_size`` frequencies.
+    """
+    return np.hstack([np.zeros(0)] +
+                     [_lombscargle_chunk(t, y, w, frequency[start:start + chunk_size])
+                      for start in range(0, len(frequency), chunk_size)])
+
+
+# The arrays used by the Lomb-Scargle worker processes, which are sent once
+# to each process when the pool is created rather than with each task.
+_worker_arrays = None
+
+
+def _init_lombscargle_worker(t, y, w, frequency, chunk_size):
+    global _worker_arrays
+    _worker_arrays = t, y, w, frequency, chunk_size
+
+
+def _lombscargle_block(start, stop):
+    """
+    Compute the Lomb-Scargle power in a worker process for a block of the
+    frequencies given to `_init_lombscargle_worker`.
+    """
+    t, y, w, frequency, chunk_size = _worker_arrays
+    return _lombscargle_chunks(t, y, w, frequency[start:stop], chunk_size)
+
+
+def lombscargle(t, y, frequency, dy=None, chunk_size=None, workers=None):
+    """
+    Compute the Lomb-Scargle periodogram of unevenly sampled data.
+
+    This computes the floating-mean (generalized) periodogram with the
+    standard normalization, for which the power is in the range [0, 1].
+
+    Parameters
+    ----------
+    t : `~numpy.ndarray`
+        The times of the samples, as floating-point offsets from a reference
+        epoch.
+    y : `~numpy.ndarray`
+        The values of the samples.
+    frequency : `~numpy.ndarray`
+        The frequencies at which to compute the power, in units of the
+        inverse of the units of ``t``.
+    dy : `~numpy.ndarray`, optional
+        The uncertainties on ``y``, used to weight the samples.
+    chunk_size : int, optional
+        The number of frequencies to process at a time. Temporary arrays of
+        ``chunk_size`` by ``len(t)`` values are allocated for each chunk, so
+        this bounds the memory used. By default, the chunk size is chosen so
+        that these arrays have around four million values.
+    workers : int, optional
+        If set, the frequencies are split into contiguous blocks which are
+        processed in parallel, in chunks, using a pool of this many
+        processes. The times and values are sent once to each process, which
+        requires Python 3.7 or later. By default, the chunks are processed
+        sequentially.
+
+    Returns
+    -------
+    power : `~numpy.ndarray`
+        The periodogram power at each frequency.
+    """
+
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    frequency = np.asarray(frequency, dtype=float)
+
+    if dy is None:
+        w = np.ones_like(y)
+    else:
+        w = np.asarray(dy, dtype=float) ** -2
+
+    w /= w.sum()
+
+    y = y - w.dot(y)
+    YY = w.dot(y * y)
+
+    if chunk_size is None:
+        chunk_size = max(1, 2 ** 22 // max(1, len(t)))
+
+    if workers is None:
+        power = _lombscargle_chunks(t, y, w, frequency, chunk_size)
+    else:
+        bounds = np.linspace(0, len(frequency), workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_lombscargle_worker,
+                                 initargs=(t, y, w, frequency, chunk_size)) as executor:
+            power = np.hstack([np.zeros(0)] +
+                              list(executor.map(_lombscargle_block, bounds[:-1], bounds[1:])))
+
+    return power / YY
+
+
+def _box_least_squares_chunk(t, y, w, period, duration, oversample):
+    """
+    Run the box least squares search for a chunk of periods.
+
+    For each period, the samples are first binned in phase, with bins of
+    ``oversample`` times smaller than the shortest duration, and the search
+    over transit times and durations is then done on the binned values. ``y``
+    should already be centered and ``w`` should be normalized so that it
+    sums to one.
+    """
+
+    bin_size = duration.min() / oversample
+    duration_bins = np.maximum(1, np.round(duration / bin_size).astype(int))
+
+    wy = w * y
+
+    power = np.zeros(len(period))
+    best_duration = np.zeros(len(period), dtype=int)
+    transit_offset = np.zeros(len(period))
+    depth = np.zeros(len(period))
+
+    for i in range(len(period)):
+
+        n_bins = int(np.ceil(period[i] / bin_size))
+        indices = phase_bin_indices(t % period[i], bin_size, n_bins)
+
+        # Find the cumulative sums of the binned weights and values, wrapping
+        # around so that transits can span the end of the period.
+        w_binned = np.bincount(indices, weights=w, minlength=n_bins)
+        wy_binned = np.bincount(indices, weights=wy, minlength=n_bins)
+        n_wrap = min(duration_bins.max(), n_bins)
+        w_cumsum = np.cumsum(np.hstack([0, w_binned, w_binned[:n_wrap]]))
+        wy_cumsum = np.cumsum(np.hstack([0, wy_binned, wy_binned[:n_wrap]]))
+
+        for j, n_duration in enumerate(np.minimum(duration_bins, n_bins)):
+
+            # Weight (r) and weighted sum of values (s) inside the box for
+            # each possible starting bin
+            r = w_cumsum[n_duration:n_duration + n_bins] - w_cumsum[:n_bins]
+            s = wy_cumsum[n_duration:n_duration + n_bins] - wy_cumsum[:n_bins]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                box_power = s * s / (r * (1 - r))
+
+            # Only consider boxes with data both inside and outside that
+            # correspond to a decrease in the values.
+            box_power[(s >= 0) | (r <= 0) | (r >= 1)] = 0
+
+            best = np.argmax(box_power)
+
+            if box_power[best] > power[i]:
+                power[i] = box_power[best]
+                best_duration[i] = j
+                transit_offset[i] = (best + 0.5 * n_duration) * bin_size % period[i]
+                depth[i] = -s[best] / (r[best] * (1 - r[best]))
+
+    return power, best_duration, transit_offset, depth
+
+
+def box_least_squares(t, y, period, duration, dy=None, oversample=10,
+                      chunk_size=None, workers=None):
+    """
+    Run a box least squares (BLS) search for periodic transits.
+
+    For each trial period, the samples are binned in phase, so that the
+    search over transit times and durations scales with the number of phase
+    bins rather than the number of samples. All durations are searched in the
+    same pass over the binned values.
+
+    Parameters
+    ----------
+    t : `~numpy.ndarray`
+        The times of the samples, as floating-point offsets from a reference
+        epoch.
+    y : `~numpy.ndarray`
+        The values of the samples.
+    period : `~numpy.ndarray`
+        The trial periods, in the same units as ``t``.
+    duration : `~numpy.ndarray`
+        The trial transit durations, in the same units as ``t``.
+    dy : `~numpy.ndarray`, optional
+        The uncertainties on ``y``, used to weight the samples.
+    oversample : int, optional
+        The number of phase bins per shortest duration.
+    chunk_size : int, optional
+        The number of periods to process in each task when using several
+        processes. By default, the periods are split evenly between the
+        processes.
+    workers : int, optional
+        If set, the periods are processed in parallel using a pool of this
+        many processes. By default, the periods are processed sequentially.
+
+    Returns
+    -------
+    power : `~numpy.ndarray`
+        The fraction of the variance explained by the best box model at each
+        period, in the range [0, 1].
+    best_duration : `~numpy.ndarray`
+        The index in ``duration`` of the duration of the best box model.
+    transit_offset : `~numpy.ndarray`
+        The time of the middle of the transit for the best box model, in the
+        range [0, period).
+    depth : `~numpy.ndarray`
+        The depth of the transit for the best box model.
+    """
+
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    period = np.atleast_1d(np.asarray(period, dtype=float))
+    duration = np.atleast_1d(np.asarray(duration, dtype=float))
+
+    if dy is None:
+        w = np.ones_like(y)
+    else:
+        w = np.asarray(dy, dtype=float) ** -2
+
+    w /= w.sum()
+
+    y = y - w.dot(y)
+    YY = w.dot(y * y)
+
+    if workers is None:
+        results = [_box_least_squares_chunk(t, y, w, period, duration, oversample)]
+    else:
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(len(period) / workers)))
+        chunks = [period[start:start + chunk_size]
+                  for start in range(0, len(period), chunk_size)]
+        n_chunks = len(chunks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_box_least_squares_chunk, [t] * n_chunks,
+                                        [y] * n_chunks, [w] * n_chunks, chunks,
+                                        [duration] * n_chunks, [oversample] * n_chunks))
+
+    power, best_duration, transit_offset, depth = [np.hstack(values) for values in zip(*results)]
+
+    return power / YY, best_duration, transit_offset, depth
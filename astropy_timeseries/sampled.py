@@ -1,21 +1,265 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
-from copy import deepcopy
-from distutils.version import LooseVersion
+import os
+import asyncio
+import warnings
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 
-import astropy
-from astropy.table import groups, QTable, Table
+from astropy.io import registry
+from astropy.table import groups, Column, MaskedColumn, QTable, Table
 from astropy.time import Time, TimeDelta
 from astropy import units as u
 from astropy.units import Quantity
 
-from .core import BaseTimeSeries
+from . import transfer
+from .core import (BaseTimeSeries, _copy_meta, _has_class_reader,
+                   _time_range_mask)
+
+try:
+    import erfa
+except ImportError:  # astropy < 4.2
+    from astropy import _erfa as erfa
 
 __all__ = ['TimeSeries']
 
-ASTROPY_LT_32 = LooseVersion(astropy.__version__) < LooseVersion("3.2")
+# The Julian Date of the epoch of datetime64 values (1970-01-01T00:00:00)
+UNIX_EPOCH_JD = 2440587.5
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+NAT = np.iinfo(np.int64).min
+
+# Formats of the Table readers which can store Time columns, and therefore
+# the time column of a time series without ``time_column`` being given.
+TIME_COLUMN_FORMATS = ('ascii.ecsv', 'asdf', 'fits', 'hdf5', 'parquet', 'votable')
+
+# get_event_loop is deprecated in coroutines in favour of get_running_loop,
+# which was added in Python 3.7.
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+def _read_file(cls, filename, args, kwargs):
+    """
+    Read a file with ``cls.read``, returning the exception raised instead of
+    raising it if the file cannot be read.
+    """
+    try:
+        return cls.read(filename, *args, **kwargs)
+    except Exception as exc:
+        return exc
+
+
+def _read_file_shared(cls, filename, args, kwargs):
+    """
+    Read a file with `_read_file` in a worker process, storing the data of the
+    time series read in shared memory if possible, so that the result can be
+    sent back without pickling the data through the process pool.
+    """
+    result = _read_file(cls, filename, args, kwargs)
+    if transfer.shared_memory is not None and not isinstance(result, Exception):
+        try:
+            return transfer.to_shared_memory(result)
+        except OSError:  # For example, if the shared memory is full
+            pass
+    return result
+
+
+def _relative_time_sec(time, reference):
+    """
+    Return the offset in seconds of ``time`` relative to ``reference``.
+
+    The offsets are computed directly from the two-part Julian Dates, which
+    avoids the overhead of creating a `~astropy.time.TimeDelta`.
+    """
+    if reference.scale != time.scale:
+        reference = getattr(reference, time.scale)
+    return ((time.jd1 - reference.jd1) + (time.jd2 - reference.jd2)) * 86400.
+
+
+def _filled_quantity(column):
+    """
+    Return the values of a column as a floating-point
+    `~astropy.units.Quantity`, with the masked values replaced by NaN so that
+    they are discarded along with the other non-finite values.
+    """
+    if hasattr(column, 'filled'):
+        column = column.astype(float).filled(np.nan)
+    return u.Quantity(column, dtype=float)
+
+
+def _relative_time_sec_parts(jd1, jd2, reference_jd1, reference_jd2):
+    """
+    Return the offset in seconds of two-part Julian dates relative to a
+    reference as the sum of two floating-point values, the second being a
+    small correction to the first, which preserves the full precision of the
+    two-part Julian dates. The inputs can be any arrays that broadcast
+    together.
+    """
+    days_lo, days_lo_error = _two_sum(jd2, -reference_jd2)
+    seconds_lo, seconds_lo_error = _two_product(days_lo, 86400.)
+    # The integer parts of the Julian dates are exactly representable in
+    # seconds, so the only rounding errors are in the fractional parts.
+    dt_hi, dt_hi_error = _two_sum((jd1 - reference_jd1) * 86400., seconds_lo)
+    return dt_hi, dt_hi_error + (seconds_lo_error + days_lo_error * 86400.)
+
+
+def _two_sum(a, b):
+    """
+    Return the sum of ``a`` and ``b`` as the floating-point sum and its exact
+    rounding error (Knuth's algorithm).
+    """
+    total = a + b
+    b_virtual = total - a
+    error = (a - (total - b_virtual)) + (b - b_virtual)
+    return total, error
+
+
+def _two_product(a, b):
+    """
+    Return the product of ``a`` and ``b`` as the floating-point product and
+    its exact rounding error (Dekker's algorithm).
+    """
+    product = a * b
+    a_hi, a_lo = _split(a)
+    b_hi, b_lo = _split(b)
+    error = ((a_hi * b_hi - product) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    return product, error
+
+
+def _split(a):
+    """
+    Split floating-point values into two halves with at most 26 significant
+    bits each, such that the sum of the halves is exactly ``a``.
+    """
+    c = 134217729. * a  # 2 ** 27 + 1
+    a_hi = c - (c - a)
+    return a_hi, a - a_hi
+
+
+def _utc_day_ns(days):
+    """
+    Return the length in nanoseconds of UTC days, given as integer numbers of
+    days since 1970-01-01. Days ending with a leap second are longer, which is
+    taken into account in the fraction of the day of UTC Julian Dates, so the
+    lengths are computed as in ``erfa.dtf2d``.
+    """
+
+    first = days.min()
+    day_range = np.arange(first, days.max() + 1).astype(float)
+
+    with warnings.catch_warnings():
+        # Dates before 1960 give warnings about dubious years
+        warnings.simplefilter('ignore', erfa.ErfaWarning)
+        year, month, day, _ = erfa.jd2cal(UNIX_EPOCH_JD, day_range)
+        next_year, next_month, next_day, _ = erfa.jd2cal(UNIX_EPOCH_JD + 1, day_range)
+        dat0 = erfa.dat(year, month, day, 0.)
+        dat12 = erfa.dat(year, month, day, 0.5)
+        dat24 = erfa.dat(next_year, next_month, next_day, 0.)
+
+    # Any jump in TAI-UTC at the end of the day (excluding the drift before
+    # 1972) is a leap second
+    leap_ns = np.round((dat24 - (2 * dat12 - dat0)) * 1e9).astype(np.int64)
+
+    return (NS_PER_DAY + leap_ns)[days - first]
+
+
+def _datetime64_to_jd(values, scale):
+    """
+    Convert datetime64 values to two-part Julian Dates in the given scale,
+    using integer arithmetic on the nanoseconds since 1970-01-01 instead of
+    parsing the values. Returns the two parts of the Julian Dates and a mask
+    of the NaT values, for which the Julian Dates are the epoch.
+    """
+
+    ns = np.asarray(values).astype('datetime64[ns]', copy=False).view(np.int64)
+
+    nat = ns == NAT
+    if np.any(nat):
+        ns = np.where(nat, 0, ns)
+
+    days = ns // NS_PER_DAY
+    ns_of_day = ns - days * NS_PER_DAY
+
+    day_ns = _utc_day_ns(days) if scale == 'utc' and len(days) > 0 else NS_PER_DAY
+
+    return days + UNIX_EPOCH_JD, ns_of_day / day_ns, nat
+
+
+def _jd_to_datetime64(time):
+    """
+    Convert times to datetime64[ns] values in their scale, using integer
+    arithmetic on the days since 1970-01-01 instead of formatting the times.
+    Masked times are converted to NaT.
+    """
+
+    shifted = time.jd1 - UNIX_EPOCH_JD
+    whole = np.floor(shifted)
+    fraction = (shifted - whole) + time.jd2
+    carry = np.floor(fraction)
+    fraction -= carry
+
+    masked = time.masked and np.any(time.mask)
+    if masked:
+        whole[time.mask] = 0
+        carry[time.mask] = 0
+        fraction[time.mask] = 0
+
+    days = (whole + carry).astype(np.int64)
+
+    day_ns = _utc_day_ns(days) if time.scale == 'utc' and len(days) > 0 else NS_PER_DAY
+
+    ns = days * NS_PER_DAY + np.round(fraction * day_ns).astype(np.int64)
+
+    if masked:
+        ns[time.mask] = NAT
+
+    return ns.view('datetime64[ns]')
+
+
+def _shares_buffer(values):
+    """
+    Whether column values can be shared as they are with pandas, which is the
+    case for numerical values in the native byte order.
+    """
+    return (values.ndim == 1 and values.dtype.kind in 'biuf' and values.dtype.isnative)
+
+
+def _cycle_and_phase(dt_hi, dt_lo, period, period_derivative=None):
+    """
+    Return the cycle number and phase of time offsets from an epoch.
+
+    The time offsets are given as the sum of ``dt_hi`` and a small correction
+    ``dt_lo``, such as returned by ``_relative_time_sec_parts``. The number of
+    cycles is ``dt / period - period_derivative / 2 * (dt / period) ** 2``,
+    where the period is that at the epoch. The division of the time offsets
+    by the period is done with compensated arithmetic, so that the phase
+    remains accurate for long baselines. The phase is returned in the
+    range [-0.5, 0.5) and the cycle number is the nearest integer number of
+    cycles.
+    """
+
+    cycles_hi = dt_hi / period
+
+    # Find the remainder of the division exactly, and include the small part
+    # of the time offset.
+    product, error = _two_product(cycles_hi, period)
+    cycles_lo = (((dt_hi - product) - error) + dt_lo) / period
+
+    if period_derivative is not None:
+        cycles_lo = cycles_lo - 0.5 * period_derivative * cycles_hi * cycles_hi
+
+    cycle = np.floor(cycles_hi + 0.5)
+    phase = (cycles_hi - cycle) + cycles_lo
+
+    adjust = np.floor(phase + 0.5)
+    cycle += adjust
+    phase -= adjust
+
+    return cycle, phase
 
 
 class TimeSeries(BaseTimeSeries):
@@ -102,7 +346,8 @@ class TimeSeries(BaseTimeSeries):
         """
         return self['time']
 
-    def fold(self, period=None, midpoint_epoch=None):
+    def fold(self, period=None, midpoint_epoch=None, normalize_phase=False, copy=True,
+             period_derivative=None):
         """
         Return a new TimeSeries folded with a period and midpoint epoch.
 
@@ -114,31 +359,416 @@ class TimeSeries(BaseTimeSeries):
             The time to use as the midpoint epoch, at which the relative
             time offset will be 0. Defaults to the first time in the time
             series.
+        normalize_phase : bool, optional
+            If `False` (the default), the time column of the folded time
+            series is a `~astropy.time.TimeDelta` giving the time relative to
+            the midpoint epoch. If `True`, the time column is instead a
+            dimensionless `~astropy.units.Quantity` giving the phase as a
+            fraction of the period, in the range [-0.5, 0.5), which avoids
+            the overhead of `~astropy.time.TimeDelta`.
+        copy : bool, optional
+            If `True` (the default), the data columns are copied to the
+            folded time series. If `False`, the folded time series shares the
+            data columns and the metadata values with the original time series
+            (as for a slice), and only the new time column is allocated.
+        period_derivative : float, optional
+            The rate of change of the period (dimensionless). If specified,
+            ``period`` is the period at the midpoint epoch. The relative
+            times in the folded time series are then the phases multiplied
+            by ``period``.
         """
 
-        folded = self.copy()
-        folded.remove_column('time')
-
         if midpoint_epoch is None:
             midpoint_epoch = self.time[0]
         else:
             midpoint_epoch = Time(midpoint_epoch)
 
+        if period_derivative is not None:
+            period_derivative = u.Quantity(period_derivative, u.dimensionless_unscaled).value
+
         period_sec = period.to_value(u.s)
-        relative_time_sec = ((self.time - midpoint_epoch).sec + period_sec / 2) % period_sec - period_sec / 2
 
-        folded_time = TimeDelta(relative_time_sec * u.s)
+        if midpoint_epoch.scale != self.time.scale:
+            midpoint_epoch = getattr(midpoint_epoch, self.time.scale)
 
-        folded.add_column(folded_time, name='time', index=0)
+        dt_hi, dt_lo = _relative_time_sec_parts(self.time.jd1, self.time.jd2,
+                                                midpoint_epoch.jd1, midpoint_epoch.jd2)
+
+        cycle, phase = _cycle_and_phase(dt_hi, dt_lo,
+                                        period=period_sec,
+                                        period_derivative=period_derivative)
+
+        if normalize_phase:
+            folded_time = u.Quantity(phase, u.dimensionless_unscaled, copy=False)
+        else:
+            phase *= period_sec
+            folded_time = TimeDelta(phase, format='sec')
+            folded_time.format = 'jd'
+
+        folded = self.__class__()
+        folded.add_column(folded_time, name='time', copy=False)
+
+        colnames = [name for name in self.colnames if name != 'time']
+        if len(colnames) > 0:
+            folded.add_columns([self[name] for name in colnames], copy=copy)
+
+        folded.meta = _copy_meta(self.meta) if copy else self.meta.copy()
 
         return folded
 
+    def batch_fold(self, period, midpoint_epoch=None, period_derivative=None,
+                   chunk_size=None, out=None, return_cycle=False):
+        """
+        Compute the phases of all samples for many ephemerides at once.
+
+        This is intended for period searches, where the time series needs to
+        be folded at a large number of periods, or for folding with the
+        ephemerides of many targets at once. The time offsets are computed
+        once as floating-point values, and the phases for all ephemerides
+        are then computed with broadcast operations, without copying the
+        time series or creating `~astropy.time.TimeDelta` objects. The phases
+        are computed with compensated arithmetic, so that they remain
+        accurate for baselines of many cycles.
+
+        Parameters
+        ----------
+        period : `~astropy.units.Quantity`
+            The period(s) to use for folding.
+        midpoint_epoch : `~astropy.time.Time`, optional
+            The time(s) to use as the midpoint epoch, at which the phase will
+            be 0. This should either be a scalar or have the same length as
+            ``period``. Defaults to the first time in the time series.
+        period_derivative : float or `~numpy.ndarray`, optional
+            The rate(s) of change of the period (dimensionless). This should
+            either be a scalar or have the same length as ``period``. If
+            specified, ``period`` gives the period(s) at the midpoint
+            epoch(s).
+        chunk_size : int, optional
+            The number of ephemerides to process at a time. Temporary arrays
+            of ``chunk_size`` by ``len(self)`` values are allocated for each
+            chunk, so this bounds the memory used in addition to the output
+            array. By default, the chunk size is chosen so that these arrays
+            have around a million values.
+        out : `~numpy.ndarray`, optional
+            The array to store the phases in, which should have a shape of
+            ``(len(period), len(self))``. This can for example be a
+            single-precision or a memory-mapped array.
+        return_cycle : bool, optional
+            If `True`, the cycle numbers are returned in addition to the
+            phases.
+
+        Returns
+        -------
+        phase : `~numpy.ndarray`
+            The phases, as fractions of the period in the range [-0.5, 0.5),
+            with a shape of ``(len(period), len(self))``, or ``(len(self),)``
+            if ``period`` is a scalar.
+        cycle : `~numpy.ndarray`
+            The (integer) cycle numbers, relative to the midpoint epoch, with
+            the same shape as ``phase``. Only returned if ``return_cycle`` is
+            `True`.
+        """
+
+        if not isinstance(period, u.Quantity):
+            raise TypeError("period should be a Quantity")
+
+        scalar = period.isscalar
+
+        period_sec = np.atleast_1d(period.to_value(u.s))
+
+        if midpoint_epoch is None:
+            midpoint_epoch = self.time[0]
+        else:
+            midpoint_epoch = Time(midpoint_epoch)
+            if midpoint_epoch.scale != self.time.scale:
+                midpoint_epoch = getattr(midpoint_epoch, self.time.scale)
+            if not midpoint_epoch.isscalar and midpoint_epoch.shape != period.shape:
+                raise ValueError("midpoint_epoch should be a scalar or have the same "
+                                 "shape as period")
+
+        if period_derivative is not None:
+            period_derivative = u.Quantity(period_derivative, u.dimensionless_unscaled).value
+            if np.ndim(period_derivative) > 0 and np.shape(period_derivative) != period.shape:
+                raise ValueError("period_derivative should be a scalar or have the same "
+                                 "shape as period")
+            period_derivative = np.broadcast_to(period_derivative, period_sec.shape)
+
+        epoch_jd1, epoch_jd2 = [np.broadcast_to(jd, period_sec.shape)[:, np.newaxis]
+                                for jd in (midpoint_epoch.jd1, midpoint_epoch.jd2)]
+
+        n_periods, n_samples = len(period_sec), len(self)
+
+        if out is None:
+            out = np.empty((n_periods, n_samples))
+        elif out.shape != (n_periods, n_samples):
+            raise ValueError("out should have a shape of {0}".format((n_periods, n_samples)))
+
+        if return_cycle:
+            cycles = np.empty((n_periods, n_samples), dtype=np.int64)
+
+        if chunk_size is None:
+            chunk_size = max(1, 2 ** 20 // max(1, n_samples))
+
+        for start in range(0, n_periods, chunk_size):
+
+            end = min(start + chunk_size, n_periods)
+
+            dt_hi, dt_lo = _relative_time_sec_parts(self.time.jd1, self.time.jd2,
+                                                    epoch_jd1[start:end], epoch_jd2[start:end])
+
+            cycle, phase = _cycle_and_phase(dt_hi, dt_lo, period_sec[start:end, np.newaxis],
+                                            None if period_derivative is None else
+                                            period_derivative[start:end, np.newaxis])
+
+            out[start:end] = phase
+
+            if return_cycle:
+                cycles[start:end] = cycle
+
+        if scalar:
+            out = out[0]
+            if return_cycle:
+                cycles = cycles[0]
+
+        if return_cycle:
+            return out, cycles
+        else:
+            return out
+
+    def periodogram(self, column, frequency, method='lombscargle', uncertainty=None,
+                    reference_epoch=None, chunk_size=None, workers=None):
+        """
+        Compute a periodogram of one of the columns of the time series.
+
+        The times are converted once to floating-point offsets from a
+        reference epoch, and the frequency grid is processed in chunks to
+        bound the memory used. Samples where the time, value, or uncertainty
+        is not finite are ignored.
+
+        Parameters
+        ----------
+        column : str
+            The name of the column to compute the periodogram for.
+        frequency : `~astropy.units.Quantity`
+            The frequencies at which to compute the periodogram.
+        method : str, optional
+            The periodogram to compute. At the moment, only ``'lombscargle'``
+            is supported, which gives the floating-mean Lomb-Scargle
+            periodogram with the standard normalization (for which the power
+            is in the range [0, 1]).
+        uncertainty : str, optional
+            The name of the column giving the uncertainties on the values,
+            which are used to weight the samples.
+        reference_epoch : `~astropy.time.Time`, optional
+            The epoch relative to which the time offsets are computed.
+            Defaults to the first time in the time series.
+        chunk_size : int, optional
+            The number of frequencies to process at a time. Temporary arrays
+            of ``chunk_size`` by ``len(self)`` values are allocated for each
+            chunk. By default, the chunk size is chosen so that these arrays
+            have around four million values.
+        workers : int, optional
+            If set, the frequencies are split into contiguous blocks which are
+            processed in parallel, in chunks, using a pool of this many
+            processes. By default, the chunks are processed sequentially.
+
+        Returns
+        -------
+        power : `~numpy.ndarray`
+            The periodogram power at each frequency.
+        """
+
+        from .periodograms import lombscargle
+
+        if method != 'lombscargle':
+            raise ValueError("method should be 'lombscargle'")
+
+        if not isinstance(frequency, u.Quantity):
+            raise TypeError("frequency should be a Quantity")
+
+        if reference_epoch is None:
+            reference_epoch = self.time[0]
+        else:
+            reference_epoch = Time(reference_epoch)
+
+        t = _relative_time_sec(self.time, reference_epoch)
+        y = _filled_quantity(self[column]).value
+
+        if uncertainty is None:
+            dy = None
+            keep = np.isfinite(t) & np.isfinite(y)
+        else:
+            dy = _filled_quantity(self[uncertainty]).value
+            keep = np.isfinite(t) & np.isfinite(y) & np.isfinite(dy)
+            dy = dy[keep]
+
+        return lombscargle(t[keep], y[keep], frequency.to_value(u.Hz), dy=dy,
+                           chunk_size=chunk_size, workers=workers)
+
+    def box_least_squares(self, column, period, duration, uncertainty=None,
+                          reference_epoch=None, oversample=10, workers=None):
+        """
+        Search for periodic transits in one of the columns of the time series.
+
+        This runs a box least squares (BLS) search. For each trial period, the
+        samples are binned in phase (as for
+        :func:`~astropy_timeseries.fold_downsample`), so that the search
+        over transit times scales with the number of phase bins rather than
+        the number of samples, and all the durations are searched in the same
+        pass. Samples where the time, value, or uncertainty is not finite are
+        ignored.
+
+        Parameters
+        ----------
+        column : str
+            The name of the column to search.
+        period : `~astropy.units.Quantity`
+            The trial periods.
+        duration : `~astropy.units.Quantity`
+            The trial transit durations, which should all be shorter than the
+            shortest period.
+        uncertainty : str, optional
+            The name of the column giving the uncertainties on the values,
+            which are used to weight the samples.
+        reference_epoch : `~astropy.time.Time`, optional
+            The epoch relative to which the time offsets are computed.
+            Defaults to the first time in the time series.
+        oversample : int, optional
+            The number of phase bins per shortest duration.
+        workers : int, optional
+            If set, the periods are processed in parallel using a pool of
+            this many processes. By default, the periods are processed
+            sequentially.
+
+        Returns
+        -------
+        result : `~astropy.table.QTable`
+            A table with one row per trial period, giving the ``period``, the
+            ``power`` (the fraction of the variance explained by the best box
+            model, in the range [0, 1]), and the ``duration``,
+            ``transit_time`` (the time of the middle of one of the transits)
+            and ``depth`` of the best box model.
+        """
+
+        from .periodograms import box_least_squares
+
+        if not isinstance(period, u.Quantity):
+            raise TypeError("period should be a Quantity")
+
+        if not isinstance(duration, u.Quantity):
+            raise TypeError("duration should be a Quantity")
+
+        period = np.atleast_1d(period)
+        duration = np.atleast_1d(duration)
+
+        if duration.max() >= period.min():
+            raise ValueError("The durations should be shorter than the periods")
+
+        if reference_epoch is None:
+            reference_epoch = self.time[0]
+        else:
+            reference_epoch = Time(reference_epoch)
+
+        t = _relative_time_sec(self.time, reference_epoch)
+        y = _filled_quantity(self[column])
+
+        if uncertainty is None:
+            dy = None
+            keep = np.isfinite(t) & np.isfinite(y.value)
+        else:
+            dy = _filled_quantity(self[uncertainty]).value
+            keep = np.isfinite(t) & np.isfinite(y.value) & np.isfinite(dy)
+            dy = dy[keep]
+
+        power, best_duration, transit_offset, depth = box_least_squares(
+            t[keep], y.value[keep], period.to_value(u.s), duration.to_value(u.s),
+            dy=dy, oversample=oversample, workers=workers)
+
+        transit_time = reference_epoch + TimeDelta(transit_offset, format='sec')
+        if self.time.scale != transit_time.scale:
+            transit_time = getattr(transit_time, self.time.scale)
+
+        return QTable([period, power, duration[best_duration], transit_time, depth * y.unit],
+                      names=['period', 'power', 'duration', 'transit_time', 'depth'])
+
+    def segments(self, max_gap):
+        """
+        Split the time series into contiguous segments.
+
+        A new segment is started wherever the interval between two
+        consecutive samples is larger than ``max_gap``. The gaps are found
+        using a single difference over the times, and the segments are
+        returned as slices of this time series, so the data columns are not
+        copied.
+
+        Parameters
+        ----------
+        max_gap : `~astropy.units.Quantity`
+            The largest interval between consecutive samples that is not
+            considered to be a gap.
+
+        Returns
+        -------
+        segments : list of `~astropy_timeseries.TimeSeries`
+            The contiguous segments, in time order.
+        """
+
+        if not isinstance(max_gap, u.Quantity):
+            raise TypeError("max_gap should be a Quantity")
+
+        if len(self) == 0:
+            return []
+
+        time = self.time
+        interval_sec = (np.diff(time.jd1) + np.diff(time.jd2)) * 86400.
+
+        if np.any(interval_sec < 0):
+            raise ValueError("The time series should be sorted by time")
+
+        gaps = np.nonzero(interval_sec > max_gap.to_value(u.s))[0] + 1
+        edges = np.hstack([0, gaps, len(self)])
+
+        return [self[start:end] for start, end in zip(edges[:-1], edges[1:])]
+
+    def map_segments(self, func, max_gap, workers=None):
+        """
+        Apply a function to each contiguous segment of the time series.
+
+        Parameters
+        ----------
+        func : callable
+            The function to apply. This is called with each segment as
+            returned by :meth:`~astropy_timeseries.TimeSeries.segments`.
+            If ``workers`` is set, this should be picklable (e.g. a function
+            defined at the top level of a module).
+        max_gap : `~astropy.units.Quantity`
+            The largest interval between consecutive samples that is not
+            considered to be a gap.
+        workers : int, optional
+            If set, the segments are processed in parallel using a pool of
+            this many processes. By default, the segments are processed
+            sequentially.
+
+        Returns
+        -------
+        results : list
+            The return values of ``func`` for each segment, in time order.
+        """
+
+        segments = self.segments(max_gap)
+
+        if workers is None:
+            return [func(segment) for segment in segments]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, segments))
+
     def __getitem__(self, item):
         if self._is_list_or_tuple_of_str(item):
             if 'time' not in item:
                 out = QTable([self[x] for x in item],
-                             meta=deepcopy(self.meta),
                              copy_indices=self._copy_indices)
+                out.meta = _copy_meta(self.meta)
                 out._groups = groups.TableGroups(out, indices=self.groups._indices,
                                                  keys=self.groups._keys)
                 return out
@@ -151,11 +781,15 @@ class TimeSeries(BaseTimeSeries):
         return result
 
     @classmethod
-    def from_pandas(self, df, time_scale='utc'):
+    def from_pandas(self, df, time_scale='utc', copy=True):
         """
         Convert a :class:`~pandas.DataFrame` to a
         :class:`astropy_timeseries.TimeSeries`.
 
+        The times are converted from the ``datetime64`` values of the index
+        directly to Julian Dates, without intermediate conversions. Missing
+        (``NaT``) times are masked.
+
         Parameters
         ----------
         df : :class:`pandas.DataFrame`
@@ -163,6 +797,10 @@ class TimeSeries(BaseTimeSeries):
         time_scale : str
             The time scale to pass into `astropy.time.Time`.
             Defaults to ``UTC``.
+        copy : bool, optional
+            If `False`, the numerical and boolean columns share their data
+            with the data frame instead of being copied, so that modifying
+            either modifies both.
 
         """
         from pandas import DataFrame, DatetimeIndex
@@ -173,35 +811,88 @@ class TimeSeries(BaseTimeSeries):
         if not isinstance(df.index, DatetimeIndex):
             raise TypeError("DataFrame does not have a DatetimeIndex")
 
-        time = Time(df.index, scale=time_scale)
-        table = Table.from_pandas(df)
+        jd1, jd2, nat = _datetime64_to_jd(df.index.values, time_scale)
+        time = Time(jd1, jd2, format='jd', scale=time_scale, copy=False)
+        time.format = 'datetime64'
+        if np.any(nat):
+            time[nat] = np.ma.masked
+
+        # Columns with numerical dtypes are used as they are, and the other
+        # columns are converted as done by Table.from_pandas.
+        columns = OrderedDict()
+        other = []
+        for label in df.columns:
+            series = df[label]
+            if isinstance(series.dtype, np.dtype) and _shares_buffer(series.values):
+                columns[label] = Column(series.values, name=str(label), copy=False)
+            else:
+                columns[label] = None
+                other.append(label)
+
+        if other:
+            table = Table.from_pandas(df[other])
+            for label in other:
+                columns[label] = table[str(label)]
 
-        return TimeSeries(time=time, data=table)
+        return TimeSeries(time=time, data=list(columns.values()), copy=copy)
 
-    def to_pandas(self):
+    def to_pandas(self, copy=True):
         """
         Convert this :class:`~astropy_timeseries.TimeSeries` to a
         :class:`~pandas.DataFrame` with a :class:`~pandas.DatetimeIndex` index.
 
+        The times are converted directly from the Julian Dates to
+        ``datetime64`` values in the scale of the times, without intermediate
+        conversions. Masked times are converted to ``NaT``.
+
+        Parameters
+        ----------
+        copy : bool, optional
+            If `False`, the numerical and boolean columns which do not contain
+            masked values and are in the native byte order share their data
+            with the data frame instead of being copied, so that modifying
+            either modifies both.
+
         Returns
         -------
         dataframe : :class:`pandas.DataFrame`
             A pandas :class:`pandas.DataFrame` instance
         """
+        from pandas import DataFrame, DatetimeIndex
 
-        if ASTROPY_LT_32:
-            # Extract table without time column
-            table = self[[x for x in self.colnames if x != 'time']]
-            df = Table(table).to_pandas()
-            # Set index
-            df.set_index(self.time.datetime64, inplace=True)
-        else:
-            df = Table(self).to_pandas(index='time')
+        index = DatetimeIndex(_jd_to_datetime64(self.time), name='time')
+
+        # Columns with numerical dtypes are used as they are, and the other
+        # columns are converted as done by Table.to_pandas.
+        names = self.colnames[1:]
+        values = {}
+        other = []
+        for name in names:
+            col = self[name]
+            if isinstance(col, Quantity):
+                col_values = col.value
+            elif isinstance(col, MaskedColumn):
+                col_values = col.data.data if not np.any(col.mask) else None
+            elif isinstance(col, Column):
+                col_values = col.data
+            else:
+                col_values = None
+            if col_values is not None and _shares_buffer(col_values):
+                values[name] = col_values
+            else:
+                other.append(name)
 
-        return df
+        if other:
+            df = Table([self[name] for name in other], names=other, copy=False).to_pandas()
+            for name in other:
+                values[name] = df[name].values
+
+        return DataFrame(OrderedDict((name, values[name]) for name in names),
+                         index=index, copy=copy)
 
     @classmethod
-    def read(self, filename, time_column=None, time_format=None, time_scale=None, format=None, *args, **kwargs):
+    def read(self, filename, time_column=None, time_format=None, time_scale=None, format=None,
+             time_range=None, read_cache=None, *args, **kwargs):
         """
         Read and parse a file and returns a `astropy_timeseries.TimeSeries`.
 
@@ -232,6 +923,19 @@ class TimeSeries(BaseTimeSeries):
             The time format for the time column.
         time_scale: str, optional
             The time scale for the time column.
+        time_range : tuple, optional
+            If specified, only the samples with times in this ``(start,
+            stop)`` range are returned, including the start time and
+            excluding the stop time. Either time can be `None` for an
+            open-ended range. Readers defined for the
+            `astropy_timeseries.TimeSeries` class (such as the Kepler and
+            TESS readers) read only the rows needed, while for other formats
+            the rows are selected after reading the file.
+        read_cache : `~astropy_timeseries.io.cache.ReadCache`, optional
+            If specified, the time series is read from this cache if the same
+            file has already been read with the same options, and is
+            otherwise stored in the cache after reading the file. Time series
+            read from the cache are memory-mapped and read-only.
         *args : tuple, optional
             Positional arguments passed through to the data reader.
         **kwargs : dict, optional
@@ -243,24 +947,312 @@ class TimeSeries(BaseTimeSeries):
             TimeSeries corresponding to file contents.
 
         """
-        try:
-
-            # First we try the readers defined for the BinnedTimeSeries class
+        if read_cache is not None:
+            key = read_cache.key(self, filename, time_column=time_column,
+                                 time_format=time_format, time_scale=time_scale, format=format,
+                                 time_range=time_range, args=args, **kwargs)
+            time_series = read_cache.get(key)
+            if time_series is None:
+                time_series = self.read(filename, time_column=time_column, time_format=time_format,
+                                        time_scale=time_scale, format=format,
+                                        time_range=time_range, *args, **kwargs)
+                read_cache.put(key, time_series)
+            return time_series
+
+        if _has_class_reader(self, filename, format, args, kwargs):
+
+            # Use the readers defined for the TimeSeries class
+            if time_range is not None:
+                kwargs['time_range'] = time_range
             return super().read(filename, format=format, *args, **kwargs)
 
-        except TypeError:
-
-            # Otherwise we fall back to the default Table readers
+        # Otherwise we use the default Table readers
 
-            if time_column is None:
+        if time_column is None:
+            # Fail before parsing the file if its format cannot store the
+            # time column as a Time column.
+            if format is None:
+                formats = registry.identify_format('read', Table, filename, None,
+                                                   (filename,) + tuple(args), kwargs)
+            else:
+                formats = [format]
+            if formats and not any(fmt in TIME_COLUMN_FORMATS for fmt in formats):
                 raise ValueError("``time_column`` should be provided since the default Table readers are being used.")
 
-            table = Table.read(filename, format=format, *args, **kwargs)
+        table = Table.read(filename, format=format, *args, **kwargs)
 
-            if time_column in table.colnames:
-                time = Time(table.columns[time_column], scale=time_scale, format=time_format)
-                table.remove_column(time_column)
+        if time_column is None:
+            # The time column may have been written as a Time column, for
+            # example when writing a time series to an ECSV file.
+            if 'time' in table.colnames and isinstance(table['time'], Time):
+                time_column = 'time'
             else:
-                raise ValueError("Time column '{}' not found in the input data.".format(time_column))
+                raise ValueError("``time_column`` should be provided since the default Table readers are being used.")
+
+        if time_column in table.colnames:
+            time = Time(table.columns[time_column], scale=time_scale, format=time_format)
+            table.remove_column(time_column)
+        else:
+            raise ValueError("Time column '{}' not found in the input data.".format(time_column))
+
+        if time_range is not None:
+            keep = _time_range_mask(time_range, time)
+            time = time[keep]
+            table = table[keep]
+
+        return TimeSeries(time=time, data=table)
+
+    @classmethod
+    def read_many(cls, filenames, workers=None, stack=False, *args, **kwargs):
+        """
+        Read and parse many files, returning a list of time series.
+
+        This is equivalent to calling :meth:`~astropy_timeseries.TimeSeries.read`
+        for each file, except that the files can be read in parallel, and that
+        a file which cannot be read does not abort the whole batch::
+
+            >>> from astropy_timeseries import TimeSeries
+            >>> ts_list = TimeSeries.read_many(['lc1.fits', 'lc2.fits'],
+            ...                                format='tess.fits', workers=4)  # doctest: +SKIP
+
+        Parameters
+        ----------
+        filenames : iterable of str
+            The files to parse.
+        workers : int, optional
+            If set, the files are read in parallel using a pool of this many
+            processes. On Python 3.8 and later, the data of the time series
+            read is sent back through shared memory. By default, the files
+            are read sequentially.
+        stack : bool, optional
+            If `True`, the time series read are combined into a single time
+            series sorted by time using
+            :func:`~astropy_timeseries.sorted_vstack`.
+        *args : tuple, optional
+            Positional arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`.
+        **kwargs : dict, optional
+            Keyword arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`, such as ``format``.
+
+        Returns
+        -------
+        out : list or tuple
+            If ``stack`` is `False`, a list with, for each file, either the
+            time series read or the exception raised while reading it. If
+            ``stack`` is `True`, a tuple of the stacked time series (or `None`
+            if no file could be read) and a dictionary mapping the files that
+            could not be read to the exceptions raised.
+        """
+
+        filenames = list(filenames)
+
+        n_files = len(filenames)
+
+        if workers is None:
+            results = [_read_file(cls, filename, args, kwargs) for filename in filenames]
+        else:
+            # Send the files to the processes in batches to reduce the
+            # communication overhead for large numbers of small files. The
+            # data of the time series read is sent back through shared memory
+            # where available.
+            chunksize = max(1, n_files // (4 * workers))
+            transfer.start_tracker()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = [transfer.from_shared_memory(result) if isinstance(result, tuple)
+                           else result
+                           for result in executor.map(_read_file_shared, [cls] * n_files,
+                                                      filenames, [args] * n_files,
+                                                      [kwargs] * n_files, chunksize=chunksize)]
+
+        if not stack:
+            return results
+
+        from .merge import sorted_vstack
+
+        time_series = [result for result in results if not isinstance(result, Exception)]
+        errors = OrderedDict((filename, result) for filename, result in zip(filenames, results)
+                             if isinstance(result, Exception))
+
+        if len(time_series) == 0:
+            return None, errors
+
+        return sorted_vstack(time_series), errors
+
+    @classmethod
+    async def aread(cls, filename, executor=None, *args, **kwargs):
+        """
+        Read and parse a file asynchronously.
+
+        This is a coroutine which reads the file with
+        :meth:`~astropy_timeseries.TimeSeries.read` in an executor, so that
+        the event loop is not blocked while the file is read and parsed::
+
+            >>> ts = await TimeSeries.aread('lc.fits', format='tess.fits')  # doctest: +SKIP
+
+        Parameters
+        ----------
+        filename : str
+            File to parse.
+        executor : `concurrent.futures.Executor`, optional
+            The executor in which to read the file. By default, the default
+            executor of the event loop (a pool of threads) is used.
+        *args : tuple, optional
+            Positional arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`.
+        **kwargs : dict, optional
+            Keyword arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`, such as ``format``.
+
+        Returns
+        -------
+        out : `~astropy_timeseries.TimeSeries`
+            The time series read.
+        """
+        loop = _get_running_loop()
+        result = await loop.run_in_executor(executor, _read_file, cls, filename, args, kwargs)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @classmethod
+    async def aread_many(cls, filenames, concurrency=8, executor=None, *args, **kwargs):
+        """
+        Read and parse many files asynchronously.
+
+        This is a coroutine which reads the files with
+        :meth:`~astropy_timeseries.TimeSeries.read` in an executor, reading
+        at most ``concurrency`` files at the same time. As for
+        :meth:`~astropy_timeseries.TimeSeries.read_many`, a file which cannot
+        be read does not abort the whole batch::
+
+            >>> ts_list = await TimeSeries.aread_many(['lc1.fits', 'lc2.fits'],
+            ...                                       format='tess.fits')  # doctest: +SKIP
+
+        Parameters
+        ----------
+        filenames : iterable of str
+            The files to parse.
+        concurrency : int, optional
+            The maximum number of files read at the same time by this call.
+        executor : `concurrent.futures.Executor`, optional
+            The executor in which to read the files. By default, the default
+            executor of the event loop (a pool of threads) is used.
+        *args : tuple, optional
+            Positional arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`.
+        **kwargs : dict, optional
+            Keyword arguments passed through to
+            :meth:`~astropy_timeseries.TimeSeries.read`, such as ``format``.
+
+        Returns
+        -------
+        out : list
+            A list with, for each file, either the time series read or the
+            exception raised while reading it.
+        """
+
+        if int(concurrency) != concurrency or concurrency < 1:
+            raise ValueError("concurrency should be a positive integer")
+
+        loop = _get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def read_file(filename):
+            async with semaphore:
+                return await loop.run_in_executor(executor, _read_file, cls, filename, args, kwargs)
+
+        return list(await asyncio.gather(*[read_file(filename) for filename in filenames]))
+
+    @classmethod
+    def iter_read(cls, filename, time_column, chunk_rows=100000, time_format=None,
+                  time_scale=None, format=None, **kwargs):
+        """
+        Read a large CSV or ECSV file in chunks, yielding a time series for
+        each chunk.
+
+        This makes it possible to process files which do not fit in memory,
+        for example to bin or compute statistics incrementally::
+
+            >>> from astropy_timeseries import TimeSeries
+            >>> for chunk in TimeSeries.iter_read('large.ecsv', time_column='time',
+            ...                                   chunk_rows=10 ** 6):  # doctest: +SKIP
+            ...     process(chunk)
+
+        The header of the file (including the ECSV header, which defines the
+        units and types of the columns) is used for each chunk, so that all
+        chunks are parsed consistently. Each row of the file should be on a
+        single line. The rows in the file should be sorted by time.
+
+        Parameters
+        ----------
+        filename : str
+            File to parse.
+        time_column : str
+            The name of the time column.
+        chunk_rows : int, optional
+            The maximum number of rows in each chunk.
+        time_format : str, optional
+            The time format for the time column.
+        time_scale : str, optional
+            The time scale for the time column.
+        format : str, optional
+            File format specifier, which should be ``'ascii.ecsv'`` or
+            ``'ascii.csv'``. By default, this is determined from the extension
+            of the file.
+        **kwargs : dict, optional
+            Keyword arguments passed through to `~astropy.table.Table.read`.
+
+        Yields
+        ------
+        chunk : `astropy_timeseries.TimeSeries`
+            The time series for each chunk of rows.
+        """
+
+        if format is None:
+            extension = os.path.splitext(str(filename))[1].lower()
+            format = {'.ecsv': 'ascii.ecsv', '.csv': 'ascii.csv'}.get(extension)
+
+        if format not in ('ascii.ecsv', 'ascii.csv', 'csv'):
+            raise ValueError("format should be 'ascii.ecsv' or 'ascii.csv'")
+
+        previous_time = None
+
+        with open(filename) as f:
+
+            # The header consists of any comment lines (which for ECSV
+            # contain the column definitions) followed by the line with the
+            # column names.
+            header = []
+            for line in f:
+                header.append(line)
+                if line.strip() and not line.lstrip().startswith('#'):
+                    break
+
+            while True:
+
+                lines = list(islice(f, chunk_rows))
+
+                if len(lines) == 0:
+                    break
+
+                table = Table.read(header + lines, format=format, **kwargs)
+
+                if len(table) == 0:
+                    continue
+
+                if time_column in table.colnames:
+                    time = Time(table.columns[time_column], scale=time_scale, format=time_format)
+                    table.remove_column(time_column)
+                else:
+                    raise ValueError("Time column '{}' not found in the input data.".format(time_column))
+
+                # Check that the times are sorted within the chunk and
+                # relative to the previous chunk.
+                reference = time[0] if previous_time is None else previous_time
+                relative_time = _relative_time_sec(time, reference)
+                if relative_time[0] < 0 or np.any(np.diff(relative_time) < 0):
+                    raise ValueError("The time series should be sorted by time")
+                previous_time = time[-1]
 
-            return TimeSeries(time=time, data=table)
+                yield cls(time=time, data=table)
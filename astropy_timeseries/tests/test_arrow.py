@@ -0,0 +1,143 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import pytest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.table import MaskedColumn
+from astropy.time import Time
+
+from ..sampled import TimeSeries
+from ..binned import BinnedTimeSeries
+
+pa = pytest.importorskip("pyarrow")
+
+INPUT_TIME = Time(['2016-03-22T12:30:31.123456789', '2016-03-22T12:30:32',
+                   '2016-03-22T12:30:40', '2016-03-22T12:31:00'], precision=9)
+
+
+@pytest.mark.parametrize('time_encoding', ['offset', 'timestamp'])
+def test_arrow_roundtrip(time_encoding):
+
+    ts = TimeSeries(time=INPUT_TIME,
+                    data=[[1., 2., 3., 4.] * u.mJy, [1, 2, 3, 4], ['a', 'bb', 'c', 'd'],
+                          np.arange(24.).reshape((4, 2, 3))],
+                    names=['flux', 'id', 'name', 'image'])
+    ts['flux'].info.description = 'Flux'
+    ts.meta['object'] = 'KIC 10666592'
+
+    table = ts.to_arrow(time_encoding=time_encoding)
+    assert isinstance(table, pa.Table)
+    assert table.column_names == ['time', 'flux', 'id', 'name', 'image']
+    if time_encoding == 'timestamp':
+        assert table.schema.field('time').type == pa.timestamp('ns', tz='UTC')
+    else:
+        assert table.schema.field('time').type == pa.float64()
+
+    ts2 = TimeSeries.from_arrow(table)
+    assert isinstance(ts2, TimeSeries)
+    assert ts2.colnames == ts.colnames
+    assert ts2.meta == ts.meta
+    assert ts2.time.scale == 'utc'
+    assert ts2.time.format == 'isot'
+    assert ts2.time.precision == 9
+    assert np.all(np.abs((ts2.time - ts.time).to_value(u.ns)) < 1)
+    assert ts2['flux'].unit is u.mJy
+    assert ts2['flux'].info.description == 'Flux'
+    assert_equal(ts2['flux'].value, ts['flux'].value)
+    assert_equal(ts2['id'], ts['id'])
+    assert_equal(ts2['name'], ts['name'])
+    assert ts2['name'].dtype == ts['name'].dtype
+    assert ts2['image'].shape == (4, 2, 3)
+    assert_equal(ts2['image'], ts['image'])
+
+
+def test_arrow_zero_copy():
+
+    ts = TimeSeries(time=INPUT_TIME, data=[[1., 2., 3., 4.] * u.mJy], names=['flux'])
+
+    table = ts.to_arrow()
+    flux = table.column('flux').chunk(0)
+    assert np.shares_memory(flux.to_numpy(), ts['flux'].value)
+
+    ts2 = TimeSeries.from_arrow(table)
+    assert np.shares_memory(ts2['flux'].value, ts['flux'].value)
+    # Columns sharing Arrow buffers are read-only
+    assert not ts2['flux'].value.flags.writeable
+
+
+def test_arrow_masked():
+
+    time = INPUT_TIME.copy()
+    time[2] = np.ma.masked
+
+    ts = TimeSeries(time=time, data=[MaskedColumn([1., 2., 3., 4.], mask=[0, 1, 0, 0])],
+                    names=['flux'])
+
+    for time_encoding in ('offset', 'timestamp'):
+        table = ts.to_arrow(time_encoding=time_encoding)
+        assert table.column('time').null_count == 1
+        assert table.column('flux').null_count == 1
+        ts2 = TimeSeries.from_arrow(table)
+        assert_equal(ts2.time.mask, [0, 0, 1, 0])
+        assert_equal(ts2['flux'].mask, [0, 1, 0, 0])
+        assert_equal(ts2['flux'][[0, 2, 3]], [1., 3., 4.])
+
+
+def test_arrow_binned():
+
+    ts = BinnedTimeSeries(time_bin_start='2016-03-22T12:30:31', time_bin_size=3 * u.s,
+                          n_bins=4, data=[[1, 2, 3, 4]], names=['counts'])
+
+    ts2 = BinnedTimeSeries.from_arrow(ts.to_arrow())
+    assert isinstance(ts2, BinnedTimeSeries)
+    assert ts2.colnames == ts.colnames
+    assert np.all(np.abs((ts2.time_bin_start - ts.time_bin_start).to_value(u.ns)) < 1)
+    assert_equal(ts2.time_bin_size.to_value(u.s), [3, 3, 3, 3])
+    assert_equal(ts2['counts'], [1, 2, 3, 4])
+
+
+def test_arrow_scales():
+
+    # Times in scales other than UTC are converted to timestamps in their
+    # scale, without a time zone
+    ts = TimeSeries(time=Time([2458000.5, 2458001.25], format='jd', scale='tdb'))
+    table = ts.to_arrow(time_encoding='timestamp')
+    assert table.schema.field('time').type == pa.timestamp('ns')
+    ts2 = TimeSeries.from_arrow(table)
+    assert ts2.time.scale == 'tdb'
+    assert ts2.time.format == 'jd'
+    assert_equal(ts2.time.jd, [2458000.5, 2458001.25])
+
+
+def test_from_arrow_plain():
+
+    # Timestamp columns of tables without metadata are read as UTC times
+    table = pa.table({'time': pa.array(np.array(['2016-03-22T12:30:31', '2016-03-22T12:30:32'],
+                                                dtype='datetime64[ns]')),
+                      'flux': [1., 2.]})
+    ts = TimeSeries.from_arrow(table)
+    assert ts.time.scale == 'utc'
+    assert_equal(ts.time.isot, ['2016-03-22T12:30:31.000', '2016-03-22T12:30:32.000'])
+    assert_equal(ts['flux'], [1., 2.])
+
+
+def test_arrow_invalid():
+
+    ts = TimeSeries(time=INPUT_TIME, data=[[1., 2., 3., 4.]], names=['flux'])
+
+    with pytest.raises(ValueError) as exc:
+        ts.to_arrow(time_encoding='iso')
+    assert exc.value.args[0] == "time_encoding should be one of 'offset'/'timestamp'"
+
+    ts.meta['function'] = len
+    with pytest.raises(TypeError) as exc:
+        ts.to_arrow()
+    assert exc.value.args[0] == ("The metadata should be JSON-serializable to be converted "
+                                 "to an Arrow table")
+
+    with pytest.raises(TypeError) as exc:
+        TimeSeries.from_arrow(ts)
+    assert exc.value.args[0] == "Input should be a pyarrow Table"
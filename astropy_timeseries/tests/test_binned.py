@@ -276,3 +276,37 @@ def test_read():
     assert timeseries.colnames == ['time_bin_start', 'time_bin_size', 'time_end', 'A', 'B', 'C', 'D', 'E', 'F']
     assert len(timeseries) == 10
     assert timeseries['B'].sum() == 1151.54
+
+
+def test_read_ecsv_time_columns(tmpdir):
+    filename = str(tmpdir.join('binned.ecsv'))
+    ts = BinnedTimeSeries(time_bin_start='2016-03-22T12:30:31', time_bin_size=3 * u.s,
+                          data={'flux': [1., 4., 5.] * u.mJy})
+    ts.write(filename, format='ascii.ecsv')
+
+    # The bin columns are identified without specifying column names
+    timeseries = BinnedTimeSeries.read(filename, format='ascii.ecsv')
+    assert timeseries.colnames == ['time_bin_start', 'time_bin_size', 'flux']
+    assert_equal(timeseries.time_bin_start.isot, ts.time_bin_start.isot)
+    assert_equal(timeseries.time_bin_size.to_value(u.s), [3, 3, 3])
+
+
+def test_read_time_range():
+
+    # Bins overlapping the time range should be included
+    timeseries = BinnedTimeSeries.read(CSV_FILE, time_bin_start_column='time_start',
+                                       time_bin_end_column='time_end', format='csv',
+                                       time_range=('2016-03-22T12:30:35', '2016-03-22T12:30:40'))
+    assert_equal(timeseries.time_bin_start.isot, ['2016-03-22T12:30:34.000',
+                                                  '2016-03-22T12:30:37.000'])
+
+    timeseries = BinnedTimeSeries.read(CSV_FILE, time_bin_start_column='time_start',
+                                       time_bin_end_column='time_end', format='csv',
+                                       time_range=(None, '2016-03-22T12:30:34'))
+    assert len(timeseries) == 1
+
+    with pytest.raises(ValueError) as exc:
+        BinnedTimeSeries.read(CSV_FILE, time_bin_start_column='time_start',
+                              time_bin_end_column='time_end', format='csv',
+                              time_range='2016-03-22T12:30:34')
+    assert exc.value.args[0] == "time_range should be a (start, stop) tuple"
@@ -37,6 +37,35 @@ class CommonTimeSeriesTests:
     def test_add_column(self):
         self.series['d'] = [1, 2, 3]
 
+    def test_meta_copy(self):
+        comments = ['first']
+        self.series.meta['object'] = 'KIC 10666592'
+        self.series.meta['comments'] = comments
+        self.series.meta['nested'] = {'x': [1]}
+        # Slices and column selections including the time columns share the
+        # metadata values with the original, as for tables
+        for ts in (self.series[:2], self.series[[self.time_attr] + self.series.colnames[1:]]):
+            assert ts.meta is not self.series.meta
+            assert ts.meta['comments'] is comments
+            assert ts.meta['nested'] is self.series.meta['nested']
+            ts.meta['object'] = 'KIC 1234'
+            assert self.series.meta['object'] == 'KIC 10666592'
+            assert list(ts.meta) == ['object', 'comments', 'nested']
+        # Deep copies only copy the values which can be modified in place,
+        # and do not replace the values of the original
+        ts = self.series['a', 'b']
+        assert ts.meta == self.series.meta
+        assert ts.meta['object'] is self.series.meta['object']
+        ts.meta['comments'].append('second')
+        dict(ts.meta)['comments'].append('third')
+        {**ts.meta}['nested']['x'].append(99)
+        comments.append('fourth')
+        assert self.series.meta['comments'] is comments
+        assert comments == ['first', 'fourth']
+        assert self.series.meta['nested'] == {'x': [1]}
+        assert ts.meta['comments'] == ['first', 'second', 'third']
+        assert list(ts.meta) == ['object', 'comments', 'nested']
+
     def test_add_row(self):
         self.series.add_row(self._row)
 
@@ -1,12 +1,13 @@
 import pytest
 import numpy as np
-from numpy.testing import assert_equal
+from numpy.testing import assert_equal, assert_allclose
 
 from astropy import units as u
-from astropy.time import Time
+from astropy.time import Time, TimeDelta
 
 from ..sampled import TimeSeries
-from ..downsample import simple_downsample, reduceat
+from ..binned import BinnedTimeSeries
+from ..downsample import simple_downsample, fold_downsample, reduceat
 
 INPUT_TIME = Time(['2016-03-22T12:30:31', '2016-03-22T12:30:32',
                    '2016-03-22T12:30:33', '2016-03-22T12:30:34'])
@@ -65,3 +66,50 @@ def test_downsample():
     assert_equal(down_units.time_bin_start.isot, Time(['2016-03-22T12:30:31.000']))
     assert down_units["a"].unit.name == 'ct'
     assert_equal(down_units["a"].data, np.array([2.5]))
+
+
+def test_fold_downsample():
+
+    times = Time([1, 2, 3, 8, 9, 12], format='unix')
+    ts_fold = TimeSeries(time=times, data=[[1., 4., 4., 3., 2., 3.] * u.mJy, [1, 4, 4, 3, 2, 3]],
+                         names=['flux', 'counts'])
+    ts_fold.meta['target'] = 'x'
+
+    # Folding at 4 seconds gives relative times of -1.5, -0.5, 0.5, 1.5, -1.5, 1.5
+    binned = fold_downsample(ts_fold, period=4 * u.s, n_bins=4,
+                             midpoint_epoch=Time(2.5, format='unix'))
+    assert isinstance(binned, BinnedTimeSeries)
+    assert isinstance(binned.time_bin_start, TimeDelta)
+    assert_allclose(binned.time_bin_start.sec, [-2, -1, 0, 1])
+    assert_allclose(binned.time_bin_size.to_value(u.s), [1, 1, 1, 1])
+    assert binned['flux'].unit is u.mJy
+    assert_allclose(binned['flux'].value, [1.5, 4, 4, 3])
+    assert_equal(binned['counts'], [1, 4, 4, 3])
+    assert binned.meta == {'target': 'x'}
+
+    # Empty bins should be NaN or masked
+    binned = fold_downsample(ts_fold, period=4 * u.s, time_bin_size=0.8 * u.s,
+                             midpoint_epoch=Time(2.5, format='unix'), func=np.nansum)
+    assert len(binned) == 5
+    assert_allclose(binned.time_bin_start.sec, [-2, -1.2, -0.4, 0.4, 1.2])
+    assert_allclose(binned['flux'].value, [3, 4, np.nan, 4, 6])
+    assert_equal(binned['counts'].mask, [0, 0, 1, 0, 0])
+
+
+def test_fold_downsample_invalid():
+
+    with pytest.raises(TypeError) as exc:
+        fold_downsample(None, 1 * u.s, n_bins=3)
+    assert exc.value.args[0] == "time_series should be a TimeSeries"
+
+    with pytest.raises(TypeError) as exc:
+        fold_downsample(ts, 1, n_bins=3)
+    assert exc.value.args[0] == "period should be a astropy.unit quantity"
+
+    with pytest.raises(TypeError) as exc:
+        fold_downsample(ts, 1 * u.s)
+    assert exc.value.args[0] == "Either 'n_bins' or 'time_bin_size' should be specified"
+
+    with pytest.raises(TypeError) as exc:
+        fold_downsample(ts, 1 * u.s, n_bins=3, time_bin_size=1 * u.s)
+    assert exc.value.args[0] == "Cannot specify both 'n_bins' and 'time_bin_size'"
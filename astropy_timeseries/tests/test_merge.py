@@ -0,0 +1,59 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import pytest
+
+from numpy.testing import assert_equal, assert_allclose
+
+from astropy import units as u
+from astropy.time import Time
+
+from ..sampled import TimeSeries
+from ..merge import sorted_vstack
+
+ts_a = TimeSeries(time=Time([1, 3, 5, 7], format='unix'),
+                  data=[[1, 3, 5, 7] * u.mJy, [10, 30, 50, 70]], names=['flux', 'id'])
+ts_b = TimeSeries(time=Time([2, 4, 5, 8], format='unix'),
+                  data=[[2, 4, 55, 8] * u.mJy, [20, 40, 55, 80]], names=['flux', 'id'])
+
+
+def test_sorted_vstack():
+    ts = sorted_vstack([ts_a, ts_b])
+    assert isinstance(ts, TimeSeries)
+    assert ts.colnames == ['time', 'flux', 'id']
+    assert ts.time.format == 'unix'
+    assert_allclose(ts.time.unix, [1, 2, 3, 4, 5, 5, 7, 8])
+    assert ts['flux'].unit is u.mJy
+    assert_equal(ts['flux'].value, [1, 2, 3, 4, 5, 55, 7, 8])
+    assert_equal(ts['id'], [10, 20, 30, 40, 50, 55, 70, 80])
+
+
+def test_sorted_vstack_drop_duplicates():
+    ts = sorted_vstack([ts_b, ts_a], drop_duplicates=True)
+    assert_allclose(ts.time.unix, [1, 2, 3, 4, 5, 7, 8])
+    assert_equal(ts['id'], [10, 20, 30, 40, 55, 70, 80])
+
+
+def test_sorted_vstack_scales():
+    ts_tai = TimeSeries(time=Time(['2016-03-22T12:30:33', '2016-03-22T12:30:35'], scale='tai'),
+                        data=[[3, 5]], names=['a'])
+    ts_utc = TimeSeries(time=Time(['2016-03-22T12:29:57', '2016-03-22T12:30:00'], scale='utc'),
+                        data=[[4, 7]], names=['a'])
+    ts = sorted_vstack([ts_tai, ts_utc])
+    assert ts.time.scale == 'tai'
+    assert_equal(ts['a'], [3, 4, 5, 7])
+
+
+def test_sorted_vstack_invalid():
+
+    with pytest.raises(ValueError) as exc:
+        sorted_vstack([])
+    assert exc.value.args[0] == "time_series should contain at least one TimeSeries"
+
+    with pytest.raises(TypeError) as exc:
+        sorted_vstack([ts_a, None])
+    assert exc.value.args[0] == "time_series should be a list of TimeSeries"
+
+    ts_c = TimeSeries(time=Time([9], format='unix'), data=[[1]], names=['flux'])
+    with pytest.raises(ValueError) as exc:
+        sorted_vstack([ts_a, ts_c])
+    assert exc.value.args[0] == "All time series should have the same column names"
@@ -0,0 +1,175 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import pytest
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from astropy import units as u
+from astropy.table import MaskedColumn
+from astropy.time import Time
+
+from ..sampled import TimeSeries
+from ..periodograms import lombscargle, box_least_squares
+
+
+def least_squares_power(t, y, dy, frequency):
+    # The standard Lomb-Scargle power is the fractional reduction in chi^2
+    # from fitting a sinusoid plus offset rather than a constant.
+    w = dy ** -2
+    chi2_ref = np.sum(w * (y - np.average(y, weights=w)) ** 2)
+    power = []
+    for f in frequency:
+        X = np.vstack([np.ones_like(t), np.sin(2 * np.pi * f * t), np.cos(2 * np.pi * f * t)]).T
+        theta = np.linalg.solve(np.dot(X.T * w, X), np.dot(X.T * w, y))
+        power.append(1 - np.sum(w * (y - np.dot(X, theta)) ** 2) / chi2_ref)
+    return np.array(power)
+
+
+@pytest.mark.parametrize(('chunk_size', 'workers'), [(None, None), (7, None), (7, 2), (None, 3)])
+def test_lombscargle(chunk_size, workers):
+    rng = np.random.RandomState(12345)
+    t = np.sort(rng.uniform(0, 100, 200))
+    dy = rng.uniform(0.5, 1.5, 200)
+    y = 3 + np.sin(2 * np.pi * t / 7.3) + rng.normal(0, 1, 200) * dy
+    frequency = np.linspace(0.01, 1, 50)
+
+    power = lombscargle(t, y, frequency, dy=dy, chunk_size=chunk_size, workers=workers)
+    assert_allclose(power, least_squares_power(t, y, dy, frequency), rtol=1e-8)
+
+
+def test_periodogram():
+
+    t = np.linspace(0, 30, 500)
+    ts = TimeSeries(time=Time(t, format='mjd'))
+    ts['flux'] = (10 + np.sin(2 * np.pi * t / 2.5)) * u.mJy
+    ts['flux'][10] = np.nan
+
+    frequency = np.linspace(0.1, 1, 901) / u.day
+    power = ts.periodogram('flux', frequency)
+    assert power.shape == (901,)
+    assert_allclose(frequency[np.argmax(power)].to_value(1 / u.day), 0.4)
+    assert power.max() > 0.99
+
+    # The reference epoch should not change the power
+    power_ref = ts.periodogram('flux', frequency, reference_epoch=Time(58000, format='mjd'))
+    assert_allclose(power_ref, power, atol=1e-8)
+
+
+def test_periodogram_masked():
+
+    # Masked values should be ignored, rather than the values under the mask
+    t = np.linspace(0, 30, 500)
+    flux = 10 + np.sin(2 * np.pi * t / 2.5)
+    flux[10] = 1e6
+    ts = TimeSeries(time=Time(t, format='mjd'))
+    ts['flux'] = MaskedColumn(flux, mask=np.arange(500) == 10, unit=u.mJy)
+    ts['flux_err'] = MaskedColumn(np.ones(500), mask=np.arange(500) == 20)
+
+    frequency = np.linspace(0.1, 1, 91) / u.day
+    power = ts.periodogram('flux', frequency, uncertainty='flux_err')
+
+    keep = (np.arange(500) != 10) & (np.arange(500) != 20)
+    ts_ref = TimeSeries(time=Time(t[keep], format='mjd'))
+    ts_ref['flux'] = flux[keep] * u.mJy
+    ts_ref['flux_err'] = np.ones(keep.sum())
+    power_ref = ts_ref.periodogram('flux', frequency, uncertainty='flux_err')
+    assert_allclose(power, power_ref)
+
+
+def test_periodogram_invalid():
+
+    ts = TimeSeries(time=Time([1, 2, 3], format='mjd'))
+    ts['flux'] = [1, 2, 3]
+
+    with pytest.raises(ValueError) as exc:
+        ts.periodogram('flux', [1, 2] / u.day, method='bls')
+    assert exc.value.args[0] == "method should be 'lombscargle'"
+
+    with pytest.raises(TypeError) as exc:
+        ts.periodogram('flux', [1, 2])
+    assert exc.value.args[0] == "frequency should be a Quantity"
+
+
+def transit_time_series():
+    t = np.arange(0, 30, 0.01)
+    flux = np.ones_like(t)
+    flux[np.abs((t - 0.7 + 1.6) % 3.2 - 1.6) < 0.1] -= 0.01
+    ts = TimeSeries(time=Time(55000 + t, format='mjd'))
+    ts['flux'] = flux * u.mJy
+    return ts
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_box_least_squares(workers):
+
+    ts = transit_time_series()
+
+    result = ts.box_least_squares('flux', period=np.linspace(2, 4, 201) * u.day,
+                                  duration=[0.1, 0.2, 0.3] * u.day, workers=workers)
+
+    assert result.colnames == ['period', 'power', 'duration', 'transit_time', 'depth']
+    assert len(result) == 201
+
+    best = np.argmax(result['power'])
+    assert_allclose(result['period'][best].to_value(u.day), 3.2)
+    assert_allclose(result['duration'][best].to_value(u.day), 0.2)
+    assert_allclose(result['depth'][best].to_value(u.mJy), 0.01, rtol=0.05)
+    assert result['power'][best] > 0.9
+    assert_allclose(result['transit_time'][best].mjd, 55000.7, atol=0.01)
+
+
+def test_box_least_squares_masked():
+
+    # Masked values should be ignored, rather than the values under the mask
+    ts = transit_time_series()
+    mask = np.arange(len(ts)) % 7 == 0
+    ts_ref = ts[~mask]
+    flux = ts['flux'].value
+    flux[mask] = -1e6
+    ts['flux'] = MaskedColumn(flux, mask=mask, unit=u.mJy)
+
+    period = np.linspace(2, 4, 21) * u.day
+    duration = [0.1, 0.2] * u.day
+    result = ts.box_least_squares('flux', period=period, duration=duration,
+                                  reference_epoch=ts.time[0])
+    result_ref = ts_ref.box_least_squares('flux', period=period, duration=duration,
+                                          reference_epoch=ts.time[0])
+    assert_allclose(result['power'], result_ref['power'])
+    assert_allclose(result['depth'], result_ref['depth'])
+
+
+def test_box_least_squares_function():
+
+    # The power, depth and transit time should be the same for any
+    # chunking of the periods.
+    rng = np.random.RandomState(12345)
+    t = np.sort(rng.uniform(0, 100, 500))
+    y = rng.normal(0, 1, 500)
+    period = np.linspace(5, 10, 20)
+    duration = np.array([0.5, 1])
+
+    results = box_least_squares(t, y, period, duration)
+    results_parallel = box_least_squares(t, y, period, duration, chunk_size=3, workers=2)
+    for values, values_parallel in zip(results, results_parallel):
+        assert_allclose(values, values_parallel)
+
+    assert np.all((results[0] >= 0) & (results[0] <= 1))
+    assert np.all(results[3] >= 0)
+
+
+def test_box_least_squares_invalid():
+
+    ts = transit_time_series()
+
+    with pytest.raises(TypeError) as exc:
+        ts.box_least_squares('flux', period=[1, 2], duration=0.1 * u.day)
+    assert exc.value.args[0] == "period should be a Quantity"
+
+    with pytest.raises(TypeError) as exc:
+        ts.box_least_squares('flux', period=[1, 2] * u.day, duration=0.1)
+    assert exc.value.args[0] == "duration should be a Quantity"
+
+    with pytest.raises(ValueError) as exc:
+        ts.box_least_squares('flux', period=[1, 2] * u.day, duration=[0.1, 1] * u.day)
+    assert exc.value.args[0] == "The durations should be shorter than the periods"
@@ -1,12 +1,18 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
 import os
+import asyncio
+import threading
+from time import sleep
 from datetime import datetime
+from fractions import Fraction
 
 import pytest
 
+import numpy as np
 from numpy.testing import assert_equal, assert_allclose
 
+from astropy.io import registry
 from astropy.table import Table
 from astropy.time import Time, TimeDelta
 from astropy import units as u
@@ -143,6 +149,7 @@ def test_fold():
     # Try without midpoint epoch, as it should default to the first time
     tsf = ts.fold(period=3 * u.s)
     assert isinstance(tsf.time, TimeDelta)
+    assert tsf.time.format == 'jd'
     assert_allclose(tsf.time.sec, [0, 1, -1, 1, -1, -1], rtol=1e-6)
 
     # Try with midpoint epoch
@@ -151,6 +158,43 @@ def test_fold():
     assert_allclose(tsf.time.sec, [-1.5, -0.5, 0.5, 1.5, -1.5, 1.5], rtol=1e-6)
 
 
+def test_fold_normalize_phase():
+
+    times = Time([1, 2, 3, 8, 9, 12], format='unix')
+
+    ts = TimeSeries(time=times)
+    ts['flux'] = [1, 4, 4, 3, 2, 3]
+
+    tsf = ts.fold(period=4 * u.s, midpoint_epoch=Time(2.5, format='unix'),
+                  normalize_phase=True)
+    assert isinstance(tsf.time, u.Quantity)
+    assert tsf.time.unit is u.dimensionless_unscaled
+    assert_allclose(tsf.time.value, [-0.375, -0.125, 0.125, 0.375, -0.375, 0.375], rtol=1e-6)
+
+
+def test_fold_copy():
+
+    times = Time([1, 2, 3, 8, 9, 12], format='unix')
+
+    ts = TimeSeries(time=times)
+    ts['flux'] = [1, 4, 4, 3, 2, 3]
+    ts.meta['target'] = 'x'
+
+    tsf = ts.fold(period=3 * u.s)
+    assert not np.shares_memory(tsf['flux'], ts['flux'])
+    assert tsf.meta == ts.meta
+    assert tsf.meta is not ts.meta
+
+    tsf = ts.fold(period=3 * u.s, copy=False)
+    assert tsf.colnames == ['time', 'flux']
+    assert isinstance(tsf.time, TimeDelta)
+    assert_allclose(tsf.time.sec, [0, 1, -1, 1, -1, -1], rtol=1e-6)
+    assert np.shares_memory(tsf['flux'], ts['flux'])
+    assert tsf.meta == ts.meta
+    tsf.meta['target'] = 'y'
+    assert ts.meta['target'] == 'x'
+
+
 def test_pandas():
     pandas = pytest.importorskip("pandas")
 
@@ -184,10 +228,63 @@ def test_pandas():
     assert exc.value.args[0] == 'DataFrame does not have a DatetimeIndex'
 
 
+def test_pandas_fast_path():
+    pandas = pytest.importorskip("pandas")
+
+    # Times on a day ending with a leap second, before 1972, and with a
+    # missing value
+    index = pandas.DatetimeIndex(['2016-12-31T23:59:59.999999999', '2017-01-01T00:00:00.000000001',
+                                  '1965-03-01T06:00:00.123456789', None])
+    df = pandas.DataFrame({'a': [1., 2., 3., 4.], 'b': ['w', 'x', 'y', 'z'],
+                           'c': pandas.array([1, None, 3, 4], dtype='Int64')}, index=index)
+
+    for time_scale in ('utc', 'tdb'):
+        ts = TimeSeries.from_pandas(df, time_scale=time_scale)
+        assert ts.colnames == ['time', 'a', 'b', 'c']
+        assert_equal(ts.time.mask, [False, False, False, True])
+        reference = Time(index[:3], scale=time_scale)
+        assert_allclose((ts.time[:3] - reference).sec, 0, atol=1e-10)
+        assert_equal(ts['b'], ['w', 'x', 'y', 'z'])
+        assert_equal(ts['c'].mask, [False, True, False, False])
+
+        df2 = ts.to_pandas()
+        assert_equal(df2.index.values.view('i8'), index.values.view('i8'))
+        assert list(df2.columns) == ['a', 'b', 'c']
+        assert df2['c'].isna().tolist() == [False, True, False, False]
+
+    # Numerical columns are shared with copy=False
+    ts = TimeSeries.from_pandas(df, copy=False)
+    assert np.shares_memory(ts['a'], df['a'].values)
+    assert not np.shares_memory(TimeSeries.from_pandas(df)['a'], df['a'].values)
+    df2 = ts.to_pandas(copy=False)
+    assert np.shares_memory(ts['a'], df2['a'].values)
+
+
 def test_read_time_missing():
-    with pytest.raises(ValueError) as exc:
-        TimeSeries.read(CSV_FILE, format='csv')
-    assert exc.value.args[0] == '``time_column`` should be provided since the default Table readers are being used.'
+
+    calls = []
+    # The file is identified as ascii.csv if no format is given
+    readers = {format: registry.get_reader(format, Table) for format in ('csv', 'ascii.csv')}
+
+    def counting_reader(*args, **kwargs):
+        calls.append(1)
+        return readers['csv'](*args, **kwargs)
+
+    for format in readers:
+        registry.register_reader(format, Table, counting_reader, force=True)
+    try:
+        for format in ('csv', None):
+            with pytest.raises(ValueError) as exc:
+                TimeSeries.read(CSV_FILE, format=format)
+            assert exc.value.args[0] == ('``time_column`` should be provided since the '
+                                         'default Table readers are being used.')
+    finally:
+        for format, reader in readers.items():
+            registry.register_reader(format, Table, reader, force=True)
+
+    # CSV files cannot store Time columns, so the error is raised before
+    # parsing the file
+    assert len(calls) == 0
 
 
 def test_read_time_wrong():
@@ -204,6 +301,205 @@ def test_read():
     assert timeseries['A'].sum() == 266.5
 
 
+def test_read_table_format_once():
+
+    # Files in formats defined for Table should only be parsed once
+
+    calls = []
+
+    def counting_reader(filename):
+        calls.append(filename)
+        return Table.read(filename, format='csv')
+
+    registry.register_reader('test.counting', Table, counting_reader)
+    try:
+        timeseries = TimeSeries.read(CSV_FILE, time_column='Date', format='test.counting')
+    finally:
+        registry.unregister_reader('test.counting', Table)
+
+    assert len(timeseries) == 11
+    assert calls == [CSV_FILE]
+
+
+def test_read_ecsv_time_column(tmpdir):
+    filename = str(tmpdir.join('ts.ecsv'))
+    ts = TimeSeries(time=Time('2016-03-22T12:30:31', scale='tai'), time_delta=3 * u.s,
+                    data={'flux': [1., 4., 5.] * u.mJy})
+    ts.write(filename, format='ascii.ecsv')
+
+    # The time column is identified without specifying time_column
+    timeseries = TimeSeries.read(filename, format='ascii.ecsv')
+    assert timeseries.colnames == ['time', 'flux']
+    assert timeseries.time.scale == 'tai'
+    assert_equal(timeseries.time.isot, ts.time.isot)
+
+
+def test_read_ecsv_once(tmpdir):
+
+    # Regression check for the number of times ECSV files are parsed, since
+    # the ECSV reader is the slowest of the Table readers used for time series
+
+    filename = str(tmpdir.join('ts.ecsv'))
+    ts = TimeSeries(time=Time('2016-03-22T12:30:31'), time_delta=3 * u.s,
+                    data={'flux': [1., 4., 5.] * u.mJy})
+    ts.write(filename, format='ascii.ecsv')
+
+    calls = []
+    ecsv_reader = registry.get_reader('ascii.ecsv', Table)
+
+    def counting_reader(*args, **kwargs):
+        calls.append(1)
+        return ecsv_reader(*args, **kwargs)
+
+    registry.register_reader('ascii.ecsv', Table, counting_reader, force=True)
+    try:
+        timeseries = TimeSeries.read(filename, format='ascii.ecsv')
+        timeseries_identified = TimeSeries.read(filename)
+    finally:
+        registry.register_reader('ascii.ecsv', Table, ecsv_reader, force=True)
+
+    assert_equal(timeseries['flux'], ts['flux'])
+    assert_equal(timeseries_identified['flux'], ts['flux'])
+    # Once for each read
+    assert len(calls) == 2
+
+
+def test_read_time_range():
+    timeseries = TimeSeries.read(CSV_FILE, time_column='Date', format='csv',
+                                 time_range=(Time('2008-03-19'), Time('2008-03-25')))
+    assert_equal(timeseries.time.isot, ['2008-03-19T00:00:00.000', '2008-03-20T00:00:00.000'])
+
+    timeseries = TimeSeries.read(CSV_FILE, time_column='Date', format='csv',
+                                 time_range=('2008-03-25', None))
+    assert len(timeseries) == 8
+
+
+def test_iter_read():
+    chunks = list(TimeSeries.iter_read(CSV_FILE, time_column='Date', chunk_rows=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 3]
+    assert all(isinstance(chunk, TimeSeries) for chunk in chunks)
+    timeseries = TimeSeries.read(CSV_FILE, time_column='Date', format='csv')
+    assert chunks[0].colnames == timeseries.colnames
+    assert_equal(np.hstack([chunk.time.jd for chunk in chunks]), timeseries.time.jd)
+    assert_equal(np.hstack([chunk['A'] for chunk in chunks]), timeseries['A'])
+
+
+def test_iter_read_ecsv(tmpdir):
+    filename = str(tmpdir.join('ts.ecsv'))
+    ts = TimeSeries(time=Time('2016-03-22T12:30:31', scale='tai'), time_delta=3 * u.s,
+                    data={'flux': [1., 4., 5., 3., 2.] * u.mJy})
+    ts.write(filename, format='ascii.ecsv')
+    chunks = list(TimeSeries.iter_read(filename, time_column='time', chunk_rows=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[1].time.scale == 'tai'
+    assert chunks[1]['flux'].unit is u.mJy
+    assert_equal(chunks[1]['flux'].value, [5, 3])
+
+
+def test_iter_read_invalid(tmpdir):
+
+    with pytest.raises(ValueError) as exc:
+        list(TimeSeries.iter_read(CSV_FILE, time_column='Date', format='fits'))
+    assert exc.value.args[0] == "format should be 'ascii.ecsv' or 'ascii.csv'"
+
+    with pytest.raises(ValueError) as exc:
+        list(TimeSeries.iter_read(CSV_FILE, time_column='abc'))
+    assert exc.value.args[0] == "Time column 'abc' not found in the input data."
+
+    filename = str(tmpdir.join('unsorted.csv'))
+    with open(filename, 'w') as f:
+        f.write('time,flux\n2016-03-22,1\n2016-03-23,2\n2016-03-21,3\n')
+    chunks = TimeSeries.iter_read(filename, time_column='time', chunk_rows=2)
+    assert len(next(chunks)) == 2
+    with pytest.raises(ValueError) as exc:
+        next(chunks)
+    assert exc.value.args[0] == "The time series should be sorted by time"
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_read_many(tmpdir, workers):
+    missing = str(tmpdir.join('missing.csv'))
+    results = TimeSeries.read_many([CSV_FILE, missing, CSV_FILE], workers=workers,
+                                   time_column='Date', format='csv')
+    assert len(results) == 3
+    assert isinstance(results[0], TimeSeries)
+    assert len(results[0]) == 11
+    assert isinstance(results[1], OSError)
+    assert results[2].colnames == results[0].colnames
+
+
+def test_read_many_stack(tmpdir):
+    missing = str(tmpdir.join('missing.csv'))
+    ts, errors = TimeSeries.read_many([CSV_FILE, missing, CSV_FILE], stack=True,
+                                      time_column='Date', format='csv')
+    assert isinstance(ts, TimeSeries)
+    assert len(ts) == 22
+    assert np.all(np.diff(ts.time.jd) >= 0)
+    assert list(errors) == [missing]
+
+    ts, errors = TimeSeries.read_many([missing], stack=True, time_column='Date', format='csv')
+    assert ts is None
+    assert list(errors) == [missing]
+
+
+def test_aread(tmpdir):
+    loop = asyncio.new_event_loop()
+    try:
+        timeseries = loop.run_until_complete(TimeSeries.aread(CSV_FILE, time_column='Date',
+                                                              format='csv'))
+        assert isinstance(timeseries, TimeSeries)
+        assert len(timeseries) == 11
+
+        with pytest.raises(OSError):
+            loop.run_until_complete(TimeSeries.aread(str(tmpdir.join('missing.csv')),
+                                                     time_column='Date', format='csv'))
+    finally:
+        loop.close()
+
+
+def test_aread_many(tmpdir):
+
+    # The number of files read at the same time should be bounded
+
+    lock = threading.Lock()
+    active = [0]
+    max_active = [0]
+
+    def slow_reader(filename):
+        with lock:
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+        sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return Table.read(filename, format='csv')
+
+    missing = str(tmpdir.join('missing.csv'))
+
+    registry.register_reader('test.slow', Table, slow_reader)
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(TimeSeries.aread_many([CSV_FILE] * 6 + [missing],
+                                                                concurrency=2, time_column='Date',
+                                                                format='test.slow'))
+    finally:
+        loop.close()
+        registry.unregister_reader('test.slow', Table)
+
+    assert len(results) == 7
+    assert all(isinstance(result, TimeSeries) for result in results[:6])
+    assert isinstance(results[6], OSError)
+    assert max_active[0] == 2
+
+    loop = asyncio.new_event_loop()
+    try:
+        with pytest.raises(ValueError) as exc:
+            loop.run_until_complete(TimeSeries.aread_many([CSV_FILE], concurrency=0))
+        assert exc.value.args[0] == "concurrency should be a positive integer"
+    finally:
+        loop.close()
+
+
 @pytest.mark.remote_data(source='astropy')
 def test_keppler_astropy():
     filename = get_pkg_data_filename('timeseries/kplr010666592-2009131110544_slc.fits')
@@ -224,3 +520,153 @@ def test_tess_astropy():
     assert timeseries["sap_flux"].unit.to_string() == 'electron / s'
     assert len(timeseries) == 19261
     assert len(timeseries.columns) == 20
+
+
+def test_segments():
+
+    times = Time([1, 2, 3, 10, 11, 30], format='unix')
+
+    ts = TimeSeries(time=times)
+    ts['flux'] = [1, 4, 4, 3, 2, 3]
+
+    segments = ts.segments(max_gap=5 * u.s)
+    assert len(segments) == 3
+    assert all(isinstance(segment, TimeSeries) for segment in segments)
+    assert_equal([len(segment) for segment in segments], [3, 2, 1])
+    assert_equal(segments[1]['flux'], [3, 2])
+
+    # Segments should be views of the original data
+    segments[0]['flux'][0] = 10
+    assert ts['flux'][0] == 10
+
+    assert len(ts.segments(max_gap=1 * u.min)) == 1
+    assert len(ts.segments(max_gap=0.5 * u.s)) == 6
+
+
+def test_segments_invalid():
+
+    ts = TimeSeries(time=INPUT_TIME)
+
+    with pytest.raises(TypeError) as exc:
+        ts.segments(max_gap=5)
+    assert exc.value.args[0] == "max_gap should be a Quantity"
+
+    with pytest.raises(ValueError) as exc:
+        ts.segments(max_gap=5 * u.s)
+    assert exc.value.args[0] == "The time series should be sorted by time"
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_map_segments(workers):
+
+    times = Time([1, 2, 3, 10, 11, 30], format='unix')
+
+    ts = TimeSeries(time=times)
+    ts['flux'] = [1, 4, 4, 3, 2, 3]
+
+    assert ts.map_segments(len, max_gap=5 * u.s, workers=workers) == [3, 2, 1]
+
+
+def test_batch_fold():
+
+    times = Time([1, 2, 3, 8, 9, 12], format='unix')
+
+    ts = TimeSeries(time=times)
+    ts['flux'] = [1, 4, 4, 3, 2, 3]
+
+    # A scalar period should give the same result as fold
+    phase = ts.batch_fold(period=3 * u.s)
+    assert phase.shape == (6,)
+    assert_allclose(phase * 3, ts.fold(period=3 * u.s).time.sec, atol=1e-6)
+
+    periods = [3, 4, 5] * u.s
+    epochs = Time([1, 2.5, 3], format='unix')
+    phase = ts.batch_fold(period=periods, midpoint_epoch=epochs, chunk_size=2)
+    assert phase.shape == (3, 6)
+    for i in range(3):
+        expected = ts.fold(period=periods[i], midpoint_epoch=epochs[i]).time.sec
+        assert_allclose(phase[i] * periods[i].value, expected, atol=1e-6)
+
+    out = np.zeros((3, 6), dtype=np.float32)
+    ts.batch_fold(period=periods, midpoint_epoch=epochs, chunk_size=2, out=out)
+    assert_allclose(out, phase, atol=1e-6)
+
+
+def test_batch_fold_ephemerides():
+
+    # Times of minima following a quadratic ephemeris, with the period at the
+    # epoch and the period derivative given below
+    period, period_derivative = 2000., 1e-6
+    cycles = np.array([-100, -3, 0, 1, 20, 100])
+    epoch = Time('2010-01-01T00:00:00', scale='tdb')
+    times = epoch + (period * cycles + 0.5 * period * period_derivative * cycles ** 2) * u.s
+
+    ts = TimeSeries(time=times)
+
+    phase, cycle = ts.batch_fold(period=period * u.s, midpoint_epoch=epoch,
+                                 period_derivative=period_derivative, return_cycle=True)
+    assert cycle.dtype == np.int64
+    assert_equal(cycle, cycles)
+    assert_allclose(phase, 0, atol=1e-6)
+
+    # Without the period derivative, the minima drift in phase
+    phase = ts.batch_fold(period=period * u.s, midpoint_epoch=epoch)
+    assert_allclose(phase, 0.5 * period_derivative * cycles ** 2, atol=1e-6)
+
+    # Several ephemerides at once, with the period derivative broadcast
+    phase, cycle = ts.batch_fold(period=[period, period, period / 2] * u.s,
+                                 midpoint_epoch=epoch + [0, period / 4, 0] * u.s,
+                                 period_derivative=[period_derivative, 0, 0],
+                                 chunk_size=2, return_cycle=True)
+    assert phase.shape == cycle.shape == (3, 6)
+    assert_allclose(phase[0], 0, atol=1e-6)
+    assert_equal(cycle[2], 2 * cycles)
+
+    # This should be consistent with fold
+    tsf = ts.fold(period=period * u.s, midpoint_epoch=epoch,
+                  period_derivative=period_derivative)
+    assert_allclose(tsf.time.sec, 0, atol=1e-2)
+
+
+def test_batch_fold_precision():
+
+    # Phases of a millisecond period over ten years should be accurate to
+    # the precision of the two-part Julian dates, which is not the case when
+    # computing the time offsets as single floating-point values.
+    times = Time(2455000.5, np.linspace(0, 3650, 7), format='jd', scale='tdb')
+    epoch = Time(2455000.5, 0.123456789, format='jd', scale='tdb')
+    period = 1.5578064688e-3
+
+    ts = TimeSeries(time=times)
+
+    phase, cycle = ts.batch_fold(period=period * u.s, midpoint_epoch=epoch,
+                                 return_cycle=True)
+
+    for i in range(len(ts)):
+        offset = ((Fraction(times.jd1[i]) - Fraction(epoch.jd1)) +
+                  (Fraction(times.jd2[i]) - Fraction(epoch.jd2))) * 86400 / Fraction(period)
+        assert cycle[i] == round(offset)
+        assert abs(phase[i] - float(offset - round(offset))) < 1e-12
+
+
+def test_batch_fold_invalid():
+
+    ts = TimeSeries(time=INPUT_TIME)
+
+    with pytest.raises(TypeError) as exc:
+        ts.batch_fold(period=3)
+    assert exc.value.args[0] == "period should be a Quantity"
+
+    with pytest.raises(ValueError) as exc:
+        ts.batch_fold(period=[1, 2] * u.s, out=np.zeros((3, 3)))
+    assert exc.value.args[0] == "out should have a shape of (2, 3)"
+
+    with pytest.raises(ValueError) as exc:
+        ts.batch_fold(period=1 * u.s, midpoint_epoch=INPUT_TIME[:2])
+    assert exc.value.args[0] == ("midpoint_epoch should be a scalar or have the same "
+                                 "shape as period")
+
+    with pytest.raises(ValueError) as exc:
+        ts.batch_fold(period=[1, 2] * u.s, period_derivative=[0, 1e-6, 2e-6])
+    assert exc.value.args[0] == ("period_derivative should be a scalar or have the same "
+                                 "shape as period")
@@ -0,0 +1,60 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import pytest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.table import MaskedColumn
+from astropy.time import Time
+
+from ..sampled import TimeSeries
+from .. import transfer
+
+pytestmark = pytest.mark.skipif(transfer.shared_memory is None,
+                                reason='requires multiprocessing.shared_memory')
+
+
+def test_shared_memory_roundtrip():
+
+    n = 100000
+
+    ts = TimeSeries(time=Time(58000 + np.arange(n) / 1440., format='mjd', scale='tdb'))
+    ts['flux'] = np.arange(n) * u.mJy
+    ts['quality'] = MaskedColumn(np.arange(n, dtype=np.int32) % 7, mask=np.arange(n) % 5 == 0)
+    ts['small'] = np.arange(n, dtype=np.int8)
+    ts.meta['object'] = 'KIC 10666592'
+
+    data, name, sizes, readonly = transfer.to_shared_memory(ts)
+
+    # The data of the large columns is not in the pickle
+    assert name is not None
+    assert len(data) < n
+    assert sum(sizes) > 3 * 8 * n
+
+    ts2 = transfer.from_shared_memory((data, name, sizes, readonly))
+    assert ts2.colnames == ts.colnames
+    assert ts2.meta == ts.meta
+    assert_equal(ts2.time.jd1, ts.time.jd1)
+    assert_equal(ts2.time.jd2, ts.time.jd2)
+    assert ts2['flux'].unit == u.mJy
+    assert_equal(ts2['flux'].value, ts['flux'].value)
+    assert_equal(ts2['quality'].data, ts['quality'].data)
+    assert_equal(ts2['quality'].mask, ts['quality'].mask)
+    assert_equal(ts2['small'], ts['small'])
+
+    # The columns can be modified, and the shared memory has been released
+    ts2['flux'][0] = 1 * u.Jy
+    ts2.time[0] = Time(57000, format='mjd', scale='tdb')
+    with pytest.raises(FileNotFoundError):
+        transfer.shared_memory.SharedMemory(name=name)
+
+
+def test_shared_memory_small():
+
+    # Time series without large arrays are only pickled
+    ts = TimeSeries(time=Time([58000, 58001], format='mjd'), data=[[1, 2]], names=['flux'])
+    transferred = transfer.to_shared_memory(ts)
+    assert transferred[1] is None
+    assert_equal(transfer.from_shared_memory(transferred)['flux'], [1, 2])
@@ -0,0 +1,131 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Transfer of time series from worker processes through shared memory.
+
+The time series are pickled with protocol 5, with the data of the large
+arrays stored out-of-band in a single shared memory block rather than sent
+through the pipe of the process pool, so that the data is only copied into
+the shared memory and out of it. This requires Python 3.8 or later, and on
+earlier versions the time series are pickled as usual.
+"""
+
+import io
+import pickle
+
+import numpy as np
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+__all__ = []
+
+# Buffers smaller than this are pickled in-band
+MIN_SHARED_BYTES = 2 ** 16
+
+
+def _out_of_band(state):
+    """
+    Replace the large bytes objects in the state of a pickled object by
+    buffers, which are then stored out-of-band.
+    """
+    if isinstance(state, bytes) and len(state) >= MIN_SHARED_BYTES:
+        return pickle.PickleBuffer(state)
+    elif isinstance(state, tuple):
+        return tuple(_out_of_band(value) for value in state)
+    else:
+        return state
+
+
+if shared_memory is not None:
+
+    class _SharedMemoryPickler(pickle.Pickler):
+
+        def reducer_override(self, obj):
+            # Numpy only pickles the data of plain arrays out-of-band, while
+            # subclasses such as columns and quantities include their data as
+            # bytes in their state.
+            if (isinstance(obj, np.ndarray) and type(obj) is not np.ndarray and
+                    obj.nbytes >= MIN_SHARED_BYTES):
+                reduced = obj.__reduce_ex__(5)
+                return reduced[:2] + (_out_of_band(reduced[2]),) + reduced[3:]
+            return NotImplemented
+
+
+def start_tracker():
+    """
+    Start the resource tracker, if shared memory is used, so that the worker
+    processes created afterwards share it with this process. The shared
+    memory created by the workers is then only released when this process
+    unlinks it, or exits.
+    """
+    if shared_memory is not None:
+        resource_tracker.ensure_running()
+
+
+def to_shared_memory(obj):
+    """
+    Pickle an object, storing the large buffers in shared memory. The result
+    should be passed to `from_shared_memory`, in the same or another process,
+    to unpickle the object and release the shared memory. This can only be
+    used if ``shared_memory`` is available.
+    """
+
+    buffers = []
+
+    def store(buffer):
+        raw = buffer.raw()
+        if raw.nbytes < MIN_SHARED_BYTES:
+            return True
+        buffers.append(raw)
+        return False
+
+    data = io.BytesIO()
+    _SharedMemoryPickler(data, protocol=5, buffer_callback=store).dump(obj)
+
+    sizes = [raw.nbytes for raw in buffers]
+    readonly = [raw.readonly for raw in buffers]
+
+    if len(buffers) == 0:
+        return data.getvalue(), None, sizes, readonly
+
+    memory = shared_memory.SharedMemory(create=True, size=sum(sizes))
+    try:
+        offset = 0
+        for raw in buffers:
+            memory.buf[offset:offset + raw.nbytes] = raw
+            offset += raw.nbytes
+    finally:
+        memory.close()
+
+    return data.getvalue(), memory.name, sizes, readonly
+
+
+def from_shared_memory(transferred):
+    """
+    Unpickle an object pickled by `to_shared_memory`, releasing the shared
+    memory.
+    """
+
+    data, name, sizes, readonly = transferred
+
+    buffers = []
+
+    if name is not None:
+        memory = shared_memory.SharedMemory(name=name)
+        try:
+            offset = 0
+            for size, is_readonly in zip(sizes, readonly):
+                # The buffers of array subclasses are bytes objects in their
+                # pickled state, while those of plain arrays are writable
+                # unless the arrays were read-only.
+                view = memory.buf[offset:offset + size]
+                buffers.append(bytes(view) if is_readonly else bytearray(view))
+                view.release()
+                offset += size
+        finally:
+            memory.close()
+            memory.unlink()
+
+    return pickle.loads(data, buffers=buffers)